@@ -0,0 +1,34 @@
+class Animation:
+	"""One frame sequence whose current frame is shared by every sprite showing it"""
+	def __init__(self, frames, speed):
+		self.frames = frames
+		self.speed = speed
+		self.frame_index = 0
+		self.image = self.frames[0]
+
+	def advance(self, dt):
+		self.frame_index += self.speed * dt
+		if self.frame_index >= len(self.frames):
+			self.frame_index = 0
+		self.image = self.frames[int(self.frame_index)]
+
+class AnimationClock:
+	"""Advances each animation set once per frame, however many tiles use it"""
+	def __init__(self):
+		self.animations = {}
+		self.interval = 0 # seconds between advances, 0 = every frame
+		self.elapsed = 0
+
+	def add(self, name, frames, speed):
+		if name not in self.animations:
+			self.animations[name] = Animation(frames, speed)
+		return self.animations[name]
+
+	def update(self, dt):
+		if self.interval:
+			self.elapsed += dt
+			if self.elapsed < self.interval:
+				return
+			dt, self.elapsed = self.elapsed, 0
+		for animation in self.animations.values():
+			animation.advance(dt)
@@ -0,0 +1,65 @@
+import pygame
+from settings import SOUNDS, MUSIC
+from support import resource_path
+
+class AudioManager:
+	"""
+	Sound bank shared by the whole game: every effect in SOUNDS is decoded once,
+	music is streamed with pygame.mixer.music instead of being held in memory.
+	Without a working mixer (no device, dummy driver failing) every call is a no-op
+	"""
+	def __init__(self):
+		self.sounds = {}   # name -> pygame.mixer.Sound
+		self.limits = {}   # name -> max voices at once
+		self.voices = {}   # name -> channels started for it, oldest first
+
+	def ready(self):
+		if pygame.mixer.get_init():
+			return True
+		try:
+			pygame.mixer.init()
+		except pygame.error:
+			return False
+		return True
+
+	def preload(self):
+		if self.sounds or not self.ready():
+			return
+		for name, (path, volume, limit) in SOUNDS.items():
+			try:
+				sound = pygame.mixer.Sound(resource_path(path))
+			except (pygame.error, FileNotFoundError):
+				continue
+			sound.set_volume(volume)
+			self.sounds[name] = sound
+			self.limits[name] = limit
+			self.voices[name] = []
+
+	def play(self, name):
+		sound = self.sounds.get(name)
+		if sound is None:
+			return
+
+		# forget finished voices (their channel may already play something else),
+		# then cut the oldest one if the sound is at its cap
+		voices = [channel for channel in self.voices[name] if channel.get_sound() is sound]
+		if len(voices) >= self.limits[name]:
+			voices.pop(0).stop()
+		self.voices[name] = voices
+
+		channel = sound.play()
+		if channel:
+			voices.append(channel)
+
+	def play_music(self, loops = -1):
+		if not self.ready():
+			return
+		path, volume = MUSIC
+		try:
+			pygame.mixer.music.load(resource_path(path))
+			pygame.mixer.music.set_volume(volume)
+			pygame.mixer.music.play(loops)
+		except pygame.error:
+			pass
+
+audio = AudioManager()
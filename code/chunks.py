@@ -0,0 +1,142 @@
+# chunks.py
+
+import pygame
+from settings import (TILE_SIZE, SCREEN_WIDTH, SCREEN_HEIGHT, LAYERS, CHUNK_SIZE,
+                      CHUNK_LOAD_MARGIN, CHUNK_EVICT_MARGIN, CHUNK_LOADS_PER_FRAME)
+from sprites import Generic, Entity, Water, WildFlower
+
+# TMX 瓦片层 -> 绘制层级
+TILE_LAYERS = {
+    'HouseFloor': 'house bottom',
+    'HouseFurnitureBottom': 'house bottom',
+    'HouseWalls': 'main',
+    'HouseFurnitureTop': 'main',
+}
+
+
+class Chunk:
+    """一个已实例化的世界块：只记录需要在驱逐时销毁的对象"""
+
+    def __init__(self, key):
+        self.key = key
+        self.objects = []
+
+
+class ChunkManager:
+    """
+    把地图切成 CHUNK_SIZE x CHUNK_SIZE 格的块，按摄像机位置加载/驱逐
+    每帧最多实例化 CHUNK_LOADS_PER_FRAME 块（离玩家近的先来）；瓦片图像在块第一次用到时才解码（support.load_tmx）
+    土壤、作物、树木的状态不在块里：驱逐只销毁实体，状态留在 SoilLayer / Tree 上
+    """
+
+    def __init__(self, level, water):
+        self.level = level
+        self.tmx = level.tmx_data
+        self.water = water
+        self.chunk_px = CHUNK_SIZE * TILE_SIZE
+        self.cols = -(-self.tmx.width // CHUNK_SIZE)
+        self.rows = -(-self.tmx.height // CHUNK_SIZE)
+
+        self.loaded = {}  # key -> Chunk
+
+        # 对象层按块分桶（对象本身很轻，常驻内存）
+        self.decorations = {}
+        for obj in self.tmx.get_layer_by_name('Decoration'):
+            self.decorations.setdefault(self.key_at(obj.x, obj.y), []).append(obj)
+        self.trees = {}
+        for tree in level.trees.values():
+            self.trees.setdefault(self.key_at(*tree.rect.topleft), []).append(tree)
+            tree.detach()
+
+        level.soil_layer.is_loaded = self.is_cell_loaded
+
+    def key_at(self, x, y):
+        return int(x) // self.chunk_px, int(y) // self.chunk_px
+
+    def is_cell_loaded(self, x, y):
+        return (x // CHUNK_SIZE, y // CHUNK_SIZE) in self.loaded
+
+    def chunk_cells(self, key):
+        cx, cy = key
+        return [(x, y)
+                for y in range(cy * CHUNK_SIZE, min((cy + 1) * CHUNK_SIZE, self.tmx.height))
+                for x in range(cx * CHUNK_SIZE, min((cx + 1) * CHUNK_SIZE, self.tmx.width))]
+
+    def keys_around(self, center, margin):
+        view = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        view.center = center
+        view.inflate_ip(margin * 2 * self.chunk_px, margin * 2 * self.chunk_px)
+        left, top = self.key_at(max(view.left, 0), max(view.top, 0))
+        right, bottom = self.key_at(max(view.right - 1, 0), max(view.bottom - 1, 0))
+        return {(cx, cy)
+                for cy in range(top, min(bottom, self.rows - 1) + 1)
+                for cx in range(left, min(right, self.cols - 1) + 1)}
+
+    def build_chunk(self, key):
+        """读取块内各瓦片层的 gid 并取得图像（首次用到的瓦片在这里解码），不创建任何精灵"""
+        tiles = {}
+        cells = self.chunk_cells(key)
+        for name in list(TILE_LAYERS) + ['Fence', 'Water']:
+            data = self.tmx.get_layer_by_name(name).data
+            found = []
+            for x, y in cells:
+                gid = data[y][x]
+                if gid:
+                    found.append((x, y, self.tmx.get_tile_image_by_gid(gid)))
+            tiles[name] = found
+        return tiles
+
+    def instantiate(self, key, tiles):
+        level = self.level
+        entities = level.all_sprites.entities
+        chunk = Chunk(key)
+        objects = chunk.objects
+
+        for name, layer in TILE_LAYERS.items():
+            for x, y, surf in tiles[name]:
+                objects.append(Entity((x*TILE_SIZE, y*TILE_SIZE), surf, [entities], z=LAYERS[layer]))
+        for x, y, _ in tiles['Water']:
+            objects.append(Water((x*TILE_SIZE, y*TILE_SIZE), self.water, [entities]))
+        for x, y, surf in tiles['Fence']:
+            objects.append(Generic((x*TILE_SIZE, y*TILE_SIZE), surf,
+                                   [level.all_sprites, level.collision_sprites]))
+        for obj in self.decorations.get(key, ()):
+            objects.append(WildFlower((obj.x, obj.y), obj.image,
+                                      [level.all_sprites, level.collision_sprites]))
+
+        for tree in self.trees.get(key, ()):
+            tree.attach()
+            if tree.alive:
+                level.world.insert(tree, 'tree')
+
+        self.loaded[key] = chunk
+        level.soil_layer.load_cells(self.chunk_cells(key))
+
+    def evict(self, key):
+        chunk = self.loaded.pop(key)
+        for obj in chunk.objects:
+            obj.kill()
+        for tree in self.trees.get(key, ()):
+            tree.detach()
+            self.level.world.remove(tree)
+        self.level.soil_layer.evict_cells(self.chunk_cells(key))
+
+    def update(self, center):
+        wanted = self.keys_around(center, CHUNK_LOAD_MARGIN)
+        keep = self.keys_around(center, CHUNK_EVICT_MARGIN)
+
+        for key in [key for key in self.loaded if key not in keep]:
+            self.evict(key)
+
+        missing = [key for key in wanted if key not in self.loaded]
+        if missing:
+            cx, cy = self.key_at(*center)
+            missing.sort(key=lambda key: abs(key[0] - cx) + abs(key[1] - cy))
+            for key in missing[:CHUNK_LOADS_PER_FRAME]:
+                self.instantiate(key, self.build_chunk(key))
+
+    def load_now(self, center):
+        """开局时同步加载视野内的块，避免第一帧出现空白"""
+        for key in self.keys_around(center, CHUNK_LOAD_MARGIN):
+            if key not in self.loaded:
+                self.instantiate(key, self.build_chunk(key))
@@ -0,0 +1,88 @@
+# cloud.py
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from firebase_config import firebase_config
+import profiler
+
+# 并发中的请求数上限（同时也是连接池大小）
+CLOUD_WORKERS = 8
+# (连接超时, 读取超时) 秒
+CLOUD_TIMEOUT = (3.05, 10)
+
+AUTH_URL = "https://www.googleapis.com/identitytoolkit/v3/relyingparty/{0}?key={1}"
+TOKEN_URL = "https://securetoken.googleapis.com/v1/token?key={0}"
+
+
+class CloudError(Exception):
+    """HTTP 错误；消息里带上服务器返回的正文（如 EMAIL_EXISTS、INVALID_REFRESH_TOKEN）"""
+
+    def __init__(self, status, text):
+        super().__init__(f"{status}: {text}")
+        self.status = status
+
+
+class CloudTransport:
+    """
+    Realtime Database 与登录服务的 HTTP 传输层：
+    一个 keep-alive 的 requests 会话（连接池与并发数一致），每个请求都有超时，
+    submit() 在线程池中并发执行多个请求；每种请求的耗时记入 profiler.timings
+    """
+
+    def __init__(self, config, workers=CLOUD_WORKERS, timeout=CLOUD_TIMEOUT):
+        self.database_url = config["databaseURL"]
+        self.api_key = config["apiKey"]
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cloud")
+
+    def request(self, method, url, metric, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+        finally:
+            profiler.record(metric, (time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise CloudError(response.status_code, response.text)
+        return response.json()
+
+    def submit(self, func, *args):
+        """在线程池里执行 func(*args)，返回 Future"""
+        return self.pool.submit(func, *args)
+
+    # —— Realtime Database REST ——
+    def db(self, method, path, token, data=None):
+        url = f"{self.database_url}{path}.json"
+        params = {"auth": token} if token else None
+        return self.request(method, url, f"cloud {method}", params=params, json=data)
+
+    def get(self, path, token=None):
+        return self.db("GET", path, token)
+
+    def put(self, path, data, token=None):
+        return self.db("PUT", path, token, data)
+
+    def patch(self, path, data, token=None):
+        """多位置更新：data 的键可以是相对 path 的子路径"""
+        return self.db("PATCH", path, token, data)
+
+    # —— 登录 ——
+    def sign_in(self, email, password):
+        return self.request("POST", AUTH_URL.format("verifyPassword", self.api_key), "cloud auth",
+                            json={"email": email, "password": password, "returnSecureToken": True})
+
+    def sign_up(self, email, password):
+        return self.request("POST", AUTH_URL.format("signupNewUser", self.api_key), "cloud auth",
+                            json={"email": email, "password": password, "returnSecureToken": True})
+
+    def refresh(self, refresh_token):
+        return self.request("POST", TOKEN_URL.format(self.api_key), "cloud auth",
+                            json={"grantType": "refresh_token", "refreshToken": refresh_token})
+
+
+cloud = CloudTransport(firebase_config)
@@ -0,0 +1,79 @@
+# dirty_rects.py
+
+import pygame
+
+
+def merge_rects(rects):
+    """合并相互重叠的矩形，返回互不重叠的矩形列表"""
+    merged = []
+    for rect in rects:
+        i = 0
+        while i < len(merged):
+            if merged[i].colliderect(rect):
+                rect = rect.union(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
+
+
+class DirtyRectTracker:
+    """
+    静止画面（商店、暂停菜单）的脏矩形追踪：
+    冻结时记下界面下方的世界画面，之后每帧只恢复、重画并提交界面所在的区域
+    """
+
+    def __init__(self, surface):
+        self.surface = surface
+        self.backdrop = None
+        self.rects = []
+
+    @property
+    def active(self):
+        return self.backdrop is not None
+
+    def freeze(self):
+        """在界面绘制之前调用，保存当前世界画面"""
+        self.backdrop = self.surface.copy()
+        self.rects = []
+
+    def thaw(self):
+        self.backdrop = None
+        self.rects = []
+
+    def clip(self, rects):
+        bounds = self.surface.get_rect()
+        clipped = [rect.clip(bounds) for rect in rects if rect]
+        return [rect for rect in clipped if rect.width and rect.height]
+
+    def track(self, rects):
+        """记录冻结第一帧里界面占用的区域"""
+        self.rects = merge_rects(self.clip(rects))
+
+    def restore(self, rects):
+        for rect in rects:
+            self.surface.blit(self.backdrop, rect, rect)
+
+    def redraw(self, draw, tint=None):
+        """
+        draw: 绘制界面并返回其矩形列表的函数
+        tint: 静止画面上的天空颜色，重画的区域需要再乘一次
+        返回本帧需要提交到屏幕的矩形
+        """
+        self.restore(self.rects)
+        drawn = self.clip(draw())
+
+        dirty = self.rects
+        if not all(any(old.contains(rect) for old in self.rects) for rect in drawn):
+            # 界面移动或变大：把新区域也恢复后整体重画一次
+            dirty = merge_rects(self.rects + drawn)
+            self.restore(dirty)
+            draw()
+
+        if tint is not None:
+            for rect in dirty:
+                self.surface.fill(tint, rect, special_flags=pygame.BLEND_RGBA_MULT)
+
+        self.rects = merge_rects(drawn)
+        return dirty
@@ -0,0 +1,164 @@
+# fake_rtdb.py
+"""
+本地的 Realtime Database REST 替身，用于离线调试云存档：
+    python fake_rtdb.py --port 9000
+    SOW_GAIN_DATABASE_URL=http://127.0.0.1:9000/ python main.py
+支持 GET / PUT / PATCH / DELETE <path>.json，忽略 auth 参数；数据只在内存中（可选 --data 落盘）
+--latency 给每个请求加上固定延迟，用来比较分片并行加载和整槽下载
+和真实服务一样，数组按整数键存储、空值和空列表被丢掉，读回时只有过半的下标有值才还原成数组
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+def stored(value):
+    """写入时的形式：列表变成 {"0": ...}，null / 空列表 / 空对象被丢掉（返回 None）"""
+    if isinstance(value, list):
+        value = {str(i): child for i, child in enumerate(value)}
+    if isinstance(value, dict):
+        value = {key: child for key, child in ((key, stored(child)) for key, child in value.items())
+                 if child is not None}
+        return value or None
+    return value
+
+
+def rendered(value):
+    """读出时的形式：键全是整数且 0..最大键之间过半有值时还原成数组（空位为 null），否则保持对象"""
+    if not isinstance(value, dict):
+        return value
+    value = {key: rendered(child) for key, child in value.items()}
+    if value and all(key.isdigit() for key in value):
+        size = max(int(key) for key in value) + 1
+        if len(value) * 2 > size:
+            items = [None] * size
+            for key, child in value.items():
+                items[int(key)] = child
+            return items
+    return value
+
+
+class Store:
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.root = None
+        if path:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.root = json.load(f)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def keys(url_path):
+        path = url_path[:-len(".json")] if url_path.endswith(".json") else url_path
+        return [key for key in path.split("/") if key]
+
+    def get(self, keys):
+        with self.lock:
+            node = self.root
+            for key in keys:
+                if not isinstance(node, dict) or key not in node:
+                    return None
+                node = node[key]
+            return rendered(node)
+
+    def put(self, keys, value):
+        value = stored(value)
+        with self.lock:
+            if not keys:
+                self.root = value
+            else:
+                if not isinstance(self.root, dict):
+                    self.root = {}
+                node = self.root
+                for key in keys[:-1]:
+                    if not isinstance(node.get(key), dict):
+                        node[key] = {}
+                    node = node[key]
+                if value is None:
+                    node.pop(keys[-1], None)
+                else:
+                    node[keys[-1]] = value
+            self.flush()
+
+    def patch(self, keys, value):
+        # 和 RTDB 一样，键可以是相对路径（多位置更新）
+        for path, child in value.items():
+            self.put(keys + self.keys(path), child)
+        return value
+
+    def flush(self):
+        if self.path:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.root, f)
+
+
+class Handler(BaseHTTPRequestHandler):
+    store = None
+    latency = 0.0  # 每个请求额外等待的秒数，模拟网络往返
+    protocol_version = "HTTP/1.1"  # 保持连接，和真实服务一样可以复用
+
+    def parse_request(self):
+        ok = super().parse_request()
+        if ok and self.latency:
+            time.sleep(self.latency)
+        return ok
+
+    def reply(self, value, status=200):
+        body = json.dumps(value).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def do_GET(self):
+        self.reply(self.store.get(Store.keys(urlsplit(self.path).path)))
+
+    def do_PUT(self):
+        value = self.read_body()
+        self.store.put(Store.keys(urlsplit(self.path).path), value)
+        self.reply(value)
+
+    def do_PATCH(self):
+        value = self.read_body()
+        if not isinstance(value, dict):
+            self.reply({"error": "Invalid data; couldn't parse JSON object."}, 400)
+            return
+        self.reply(self.store.patch(Store.keys(urlsplit(self.path).path), value))
+
+    def do_DELETE(self):
+        self.store.put(Store.keys(urlsplit(self.path).path), None)
+        self.reply(None)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Realtime Database REST API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--data", help="JSON file to load from and write through to")
+    parser.add_argument("--latency", type=float, default=0, help="extra delay per request, in ms")
+    args = parser.parse_args()
+
+    Handler.store = Store(args.data)
+    Handler.latency = args.latency / 1000
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"fake RTDB on http://{args.host}:{args.port}/")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,37 @@
 # firebase_auth.py
 
-import pyrebase
-from firebase_config import firebase_config
+import json
+import os
+import threading
+import time
+from cloud import cloud
 
-firebase = pyrebase.initialize_app(firebase_config)
-auth = firebase.auth()
+# 登录会话（只保存 refresh token）的位置，可用环境变量改到别处
+SESSION_FILE = os.environ.get(
+    "SOW_GAIN_SESSION_FILE",
+    os.path.join(os.path.expanduser("~"), ".sow_gain", "session.json"))
+# idToken 有效期内提前多少秒刷新；刷新失败后多久重试
+REFRESH_MARGIN = 300
+RETRY_DELAY = 30
+
+
+def rejected(error):
+    """服务器明确拒绝了 refresh token（被吊销、过期、账号停用），断网等错误不算"""
+    msg = str(error)
+    return "INVALID" in msg or "TOKEN_EXPIRED" in msg or "USER_" in msg
 
 class FirebaseAuth:
     def __init__(self):
         self.user = None
+        self.expires_at = 0
+        self.notice = ""  # 被动登出的原因，显示在登录界面上
+        self.refresher = None
+        self.wake = threading.Event()  # 会话更新后唤醒刷新线程重新计时
 
     def login(self, email: str, password: str) -> bool:
         """登录，成功返回 True 并设置 self.user"""
         try:
-            self.user = auth.sign_in_with_email_and_password(email, password)
+            self.start_session(cloud.sign_in(email, password))
             return True
         except Exception as e:
             print("🔒 Login failed:", e)
@@ -26,7 +44,7 @@ class FirebaseAuth:
         其他错误返回 False
         """
         try:
-            self.user = auth.create_user_with_email_and_password(email, password)
+            self.start_session(cloud.sign_up(email, password))
             return True
         except Exception as e:
             msg = str(e)
@@ -34,3 +52,113 @@ class FirebaseAuth:
                 return "EMAIL_EXISTS"
             print("🔑 Register failed:", e)
             return False
+
+    # —— 会话持久化与刷新 ——
+    def start_session(self, user):
+        # 整个替换 self.user：其他线程读到的永远是一份完整的 uid/token
+        self.expires_at = time.time() + int(user.get("expiresIn", 3600))
+        self.user = user
+        self.notice = ""
+        self.save_session()
+        self.wake.set()
+        if self.refresher is None:
+            self.refresher = threading.Thread(target=self.keep_fresh, daemon=True)
+            self.refresher.start()
+
+    def save_session(self):
+        """refresh token 写入仅当前用户可读写（0600）的文件，先写临时文件再替换"""
+        data = {
+            "localId":      self.user.get("localId"),
+            "email":        self.user.get("email"),
+            "refreshToken": self.user.get("refreshToken")
+        }
+        try:
+            os.makedirs(os.path.dirname(SESSION_FILE), mode=0o700, exist_ok=True)
+            tmp = SESSION_FILE + ".tmp"
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, SESSION_FILE)
+        except OSError as e:
+            print("⚠️ 无法保存登录会话：", e)
+
+    def clear_session(self):
+        try:
+            os.remove(SESSION_FILE)
+        except FileNotFoundError:
+            pass
+
+    def sign_out(self, notice=""):
+        """登出并删除保存的会话；self.user 变为 None 后游戏会回到登录界面"""
+        self.user = None
+        self.expires_at = 0
+        self.notice = notice
+        self.clear_session()
+        self.wake.set()
+
+    def refresh(self, refresh_token, saved=None):
+        """用 refresh token 换新的 idToken，返回与登录结果同格式的 user"""
+        fresh = cloud.refresh(refresh_token)
+        saved = saved or self.user or {}
+        return {
+            "localId":      fresh["user_id"],
+            "email":        saved.get("email"),
+            "idToken":      fresh["id_token"],
+            "refreshToken": fresh["refresh_token"],
+            "expiresIn":    int(fresh.get("expires_in", 3600))
+        }
+
+    def restore_session(self):
+        """启动时在后台用保存的 refresh token 恢复登录，不阻塞第一帧；成功后 self.user 被设置"""
+        try:
+            with open(SESSION_FILE, "r") as f:
+                saved = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if not saved.get("refreshToken"):
+            return
+        threading.Thread(target=self.restore, args=(saved,), daemon=True).start()
+
+    def restore(self, saved):
+        try:
+            user = self.refresh(saved["refreshToken"], saved)
+        except Exception as e:
+            print("🔒 会话恢复失败，需要重新登录：", e)
+            # 只有服务器明确拒绝时才删掉会话；断网时保留，下次启动再试
+            if rejected(e):
+                self.clear_session()
+            return
+        if self.user is None:
+            self.start_session(user)
+            print("✅ 已恢复登录，UID =", user["localId"])
+
+    def keep_fresh(self):
+        """
+        后台线程：在 idToken 过期前 REFRESH_MARGIN 秒刷新，长时间游戏也能继续云存档
+        refresh token 被服务器拒绝时登出，游戏回到登录界面；网络错误则稍后重试
+        """
+        while True:
+            self.wake.clear()
+            current = self.user
+            if current is None:
+                self.wake.wait()  # 已登出：等下一次登录
+                continue
+            delay = self.expires_at - REFRESH_MARGIN - time.time()
+            if delay > 0 and self.wake.wait(delay):
+                continue  # 会话被更新过，重新计时
+            try:
+                user = self.refresh(current["refreshToken"], current)
+            except Exception as e:
+                print("🔒 Token refresh failed:", e)
+                if rejected(e):
+                    if self.user is current:
+                        self.sign_out("Session expired, please log in again")
+                    continue
+                self.wake.wait(RETRY_DELAY)
+                continue
+            if self.user is not current:
+                continue  # 刷新期间登出或换了账号
+            self.expires_at = time.time() + int(user["expiresIn"])
+            self.user = user
+            self.save_session()
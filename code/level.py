@@ -1,5 +1,5 @@
 import pygame
-import pytmx
+from itertools import islice
 from random import randint
 from settings import SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE, LAYERS
 from save_load import SaveLoadSystem
@@ -10,9 +10,16 @@ from overlay import Overlay
 from transition import Transition
 from sky import Rain, Sky
 from menu import Menu
-from sprites import Generic, Water, WildFlower, Tree, Interaction, Particle
+from sprites import EntityGroup, Ground, Tree, Interaction, Particle
 from menu_ui import *
-from support import resource_path
+from support import resource_path, merge_tiles, load_tmx
+from dirty_rects import DirtyRectTracker
+from animation import AnimationClock
+from world_query import WorldQuery
+from chunks import ChunkManager
+from timer import timers
+from audio import audio
+from quality import QualityGovernor
 
 class Level:
     def __init__(self, auth=None, save_mode='local'):
@@ -31,7 +38,7 @@ class Level:
         # 云端存档系统（登录+模式为 cloud 时启用）
         if self.save_mode == 'cloud' and auth and auth.user.get('localId'):
             self.cloud_system = SaveSystem(auth)
-            self.save_cloud = lambda slot: self.cloud_system.save_game(slot, self.get_game_state())
+            self.save_cloud = lambda slot: self.cloud_system.save_in_background(slot, self.get_game_state())
             self.load_cloud = lambda slot: self.cloud_system.load_game(slot)
         else:
             self.cloud_system = None
@@ -40,31 +47,38 @@ class Level:
 
         # 初始化地图与场景
         pygame.init()
+        audio.preload()
         self.display_surface = pygame.display.get_surface()
+        # 商店/暂停时只提交变化区域；None 表示整帧提交
+        self.dirty = DirtyRectTracker(self.display_surface)
+        self.dirty_rects = None
         tmx_path = (resource_path('data/map.tmx'))
-        self.tmx_data = pytmx.load_pygame(tmx_path)
+        self.tmx_data = load_tmx(tmx_path)
 
         self.all_sprites = CameraGroup()
         self.collision_sprites = pygame.sprite.Group()
         self.tree_sprites = pygame.sprite.Group()
         self.interaction_sprites = pygame.sprite.Group()
+        self.trees = {}  # TMX 对象 id -> Tree
+        self.animations = AnimationClock()
+        self.world = WorldQuery()
 
         self.soil_layer = SoilLayer(self.all_sprites, self.collision_sprites, self)
         self.setup()
+        self.chunks.load_now(self.player.rect.center)
 
         self.overlay = Overlay(self.player)
         self.transition = Transition(self.reset, self.player)
         self.rain = Rain(self.all_sprites)
+        self.all_sprites.decals = self.rain.splashes
         self.raining = randint(0,10) > 7
         self.soil_layer.raining = self.raining
         self.sky = Sky()
         self.menu = Menu(self.player, self.toggle_shop)
         self.shop_active = False
+        self.quality = QualityGovernor(self)
 
-        self.success = pygame.mixer.Sound(resource_path('audio/success.wav'))
-        self.success.set_volume(0.3)
-        self.music = pygame.mixer.Sound(resource_path('audio/music.mp3'))
-        self.music.play(loops=-1)
+        audio.play_music()
 
         # ✅ 优先加载云端槽 0 → 若失败则加载本地槽 0
         init_state = None
@@ -77,37 +91,27 @@ class Level:
             
     def setup(self):
         tmx = self.tmx_data
-        Generic((0, 0), pygame.image.load(resource_path('images/world/ground.png')).convert_alpha(),
-                [self.all_sprites], z=LAYERS['ground'])
-
-        for layer in ['HouseFloor', 'HouseFurnitureBottom']:
-            for x, y, surf in tmx.get_layer_by_name(layer).tiles():
-                Generic((x*TILE_SIZE, y*TILE_SIZE), surf, [self.all_sprites], z=LAYERS['house bottom'])
-
-        for layer in ['HouseWalls', 'HouseFurnitureTop']:
-            for x, y, surf in tmx.get_layer_by_name(layer).tiles():
-                Generic((x*TILE_SIZE, y*TILE_SIZE), surf, [self.all_sprites])
-
-        for x, y, surf in tmx.get_layer_by_name('Fence').tiles():
-            Generic((x*TILE_SIZE, y*TILE_SIZE), surf, [self.all_sprites, self.collision_sprites])
+        # 整张地面图只绘制摄像机可见的部分
+        self.all_sprites.ground = Ground(
+            pygame.image.load(resource_path('images/world/ground.png')).convert_alpha(),
+            [self.all_sprites.entities])
 
         water_frames = [surf for _, _, surf in tmx.get_layer_by_name('Water').tiles()]
-        for x, y, _ in tmx.get_layer_by_name('Water').tiles():
-            Water((x*TILE_SIZE, y*TILE_SIZE), water_frames, [self.all_sprites])
+        water = self.animations.add('water', water_frames, 5)
 
+        # 树木状态（生命值、树桩、苹果）常驻内存；所在的块未加载时树会脱离所有组
         for obj in tmx.get_layer_by_name('Trees'):
-            Tree((obj.x, obj.y), obj.image,
-                 [self.all_sprites, self.collision_sprites, self.tree_sprites],
-                 obj.name, self.player_add)
+            tree = Tree((obj.x, obj.y), obj.image,
+                        [self.all_sprites, self.collision_sprites, self.tree_sprites],
+                        obj.name, self.player_add, obj.id)
+            self.trees[tree.tree_id] = tree
 
-        for obj in tmx.get_layer_by_name('Decoration'):
-            WildFlower((obj.x, obj.y), obj.image,
-                       [self.all_sprites, self.collision_sprites])
+        # 房屋、围栏、水面和花草按块在摄像机附近实例化
+        self.chunks = ChunkManager(self, water)
 
-        for x, y, _ in tmx.get_layer_by_name('Collision').tiles():
-            surf = pygame.Surface((TILE_SIZE, TILE_SIZE))
-            surf.fill('black')
-            Generic((x*TILE_SIZE, y*TILE_SIZE), surf, [self.collision_sprites])
+        # 碰撞层只需要几何形状：合并成尽量少的矩形，不再为每格建 Surface 和精灵
+        collision_tiles = [(x, y) for x, y, gid in tmx.get_layer_by_name('Collision').iter_data() if gid]
+        self.collision_rects = merge_tiles(collision_tiles, TILE_SIZE)
 
         for obj in tmx.get_layer_by_name('Player'):
             if obj.name == 'Start':
@@ -115,17 +119,28 @@ class Level:
                     pos=(obj.x, obj.y),
                     group=self.all_sprites,
                     collision_sprites=self.collision_sprites,
+                    collision_rects=self.collision_rects,
                     tree_sprites=self.tree_sprites,
                     interaction_sprites=self.interaction_sprites,
                     soil_layer=self.soil_layer,
-                    toggle_shop=self.toggle_shop)
+                    toggle_shop=self.toggle_shop,
+                    world=self.world)
             elif obj.name in ('Bed', 'Trader'):
-                Interaction((obj.x, obj.y), (obj.width, obj.height),
-                            [self.interaction_sprites], obj.name)
+                interaction = Interaction((obj.x, obj.y), (obj.width, obj.height),
+                                          [self.interaction_sprites], obj.name)
+                self.world.insert(interaction, 'interaction')
+
+    def apply_quality(self, preset):
+        self.rain.density = preset['rain_density']
+        fps = preset['animation_fps']
+        self.animations.interval = 1 / fps if fps else 0
+        self.sky.lighting = preset['lighting']
+        # 静止画面的底图按旧画质保存，下一帧重新完整绘制
+        self.dirty.thaw()
 
     def player_add(self, item):
         self.player.item_inventory[item] += 1
-        self.success.play()
+        audio.play('success')
 
     def toggle_shop(self):
         self.shop_active = not self.shop_active
@@ -137,52 +152,44 @@ class Level:
         self.soil_layer.raining = self.raining
         if self.raining:
             self.soil_layer.water_all()
-        for tree in self.tree_sprites:
-            # 添加类型检查确保是Tree实例
-            if isinstance(tree, Tree):
-                if hasattr(tree, 'apple_sprites'):
-                    for apple in tree.apple_sprites:
-                        apple.kill()
-                    tree.create_fruit()
-        
-        self.sky.start_color = [255,255,255]
+        for tree in self.trees.values():
+            if tree.alive:
+                tree.create_fruit()
+
+        self.sky.reset()
 
     def plant_collision(self):
-        for plant in self.soil_layer.plant_sprites:
-            if plant.harvestable and plant.rect.colliderect(self.player.hitbox):
-                self.player_add(plant.plant_type)
-                plant.kill()
-                Particle(plant.rect.topleft, plant.image, self.all_sprites, z=LAYERS['main'])
-                x = plant.rect.centerx // TILE_SIZE
-                y = plant.rect.centery // TILE_SIZE
-                self.soil_layer.grid[y][x].remove('P')
+        # 只检查玩家附近已成熟的作物
+        for plant in self.world.query_rect(self.player.hitbox, 'ripe plant'):
+            self.player_add(plant.plant_type)
+            self.soil_layer.harvest(plant)
+            Particle(plant.rect.topleft, plant.image, self.all_sprites, z=LAYERS['main'])
 
     def get_game_state(self):
-        apples = []
-        for tree in self.tree_sprites:
-            if isinstance(tree, Tree) and tree.alive:
-                for apple in tree.apple_sprites.sprites():
-                    apples.append({
-                        "tree_x": tree.rect.x,
-                        "tree_y": tree.rect.y,
-                        "apple_pos": (apple.rect.x - tree.rect.x, apple.rect.y - tree.rect.y)
-                    })
-                    
-            return {
+        """存档快照：不与游戏中的可变对象共享引用，可以交给后台线程编码上传"""
+        # 每棵树：生命值、是否为树桩、以 APPLE_POS 为位的苹果掩码
+        trees = [{
+            'id':     tree.tree_id,
+            'health': tree.health,
+            'alive':  tree.alive,
+            'apples': tree.apple_mask
+        } for tree in self.trees.values()]
+
+        return {
             'player': self.player.save_player_data(),
             'soil':   self.soil_layer.get_state_dict(),  # ← 保存完整土壤和植物状态
-            "apples": apples,
+            'trees':  trees,
             'map':    {'rain': self.raining},
             'sky':    {'start_color': self.sky.start_color}
-    }
+        }
 
     def apply_game_state(self, state):
         # ✅ 玩家状态
         p = state.get('player', {})
         pos = p.get('pos', (self.player.pos.x, self.player.pos.y))
         self.player.current_pos = pos
-        self.player.item_inventory = p.get('inventory', self.player.item_inventory)
-        self.player.seed_inventory = p.get('seeds', self.player.seed_inventory)
+        self.player.item_inventory = dict(p.get('inventory', self.player.item_inventory))
+        self.player.seed_inventory = dict(p.get('seeds', self.player.seed_inventory))
         self.player.money = p.get('money', self.player.money)
 
         # 天气
@@ -195,50 +202,42 @@ class Level:
         if soil_data is not None:
             self.soil_layer.load_state_dict(soil_data)
 
-        # —— 安全清除并重建树木 —— 
-        apple_backup = []
-        for spr in list(self.tree_sprites):
-            if isinstance(spr, Tree):
-                apples = [(apple.rect.x - spr.rect.x, apple.rect.y - spr.rect.y) for apple in spr.apple_sprites]
-                apple_backup.append((spr.rect.topleft, apples))
-            spr.kill()
-        for obj in self.tmx_data.get_layer_by_name('Trees'):
-            tree = Tree(
-                pos=(obj.x,obj.y),
-                surf=obj.image,
-                groups=[self.all_sprites,self.collision_sprites,self.tree_sprites],
-                name=obj.name,
-                player_add=self.player_add
-            )
-            for (pos, apples) in apple_backup:
-                if tree.rect.topleft == pos:
-                    for dx, dy in apples:
-                        Generic(
-                            pos=(tree.rect.x + dx, tree.rect.y + dy),
-                            surf=tree.apple_surf,
-                            groups=[tree.apple_sprites, self.all_sprites],
-                            z=LAYERS['fruit']
-                        )
+        # —— 按树的 id 原地还原树木 ——
+        tree_data = state.get('trees')
+        if tree_data is not None:
+            for data in tree_data:
+                tree = self.trees.get(data.get('id'))
+                if tree:
+                    tree.restore(data.get('health', 5), data.get('alive', True), data.get('apples', 0))
+        elif 'apples' in state:
+            # 旧存档只记录了苹果相对树左上角的位置
+            by_pos = {tree.rect.topleft: tree for tree in self.trees.values()}
+            masks = {}
+            for data in state['apples']:
+                tree = by_pos.get((data['tree_x'], data['tree_y']))
+                apple_pos = tuple(data['apple_pos'])
+                if tree and apple_pos in tree.apple_pos:
+                    slot = tree.apple_pos.index(apple_pos)
+                    masks[tree] = masks.get(tree, 0) | (1 << slot)
+            for tree in self.trees.values():
+                tree.restore(5, True, masks.get(tree, 0))
+
+        for tree in self.trees.values():
+            if tree.alive and tree.attached:
+                self.world.insert(tree, 'tree')
+            else:
+                self.world.remove(tree)
 
         # 天空渐变色
         sky_data = state.get('sky',{})
         if 'start_color' in sky_data:
             self.sky.start_color = sky_data['start_color']
-            
-        apple_data = state.get("apples", [])
-        for data in apple_data:
-            tree_x, tree_y = data["tree_x"], data["tree_y"]
-            apple_dx, apple_dy = data["apple_pos"]
-            for tree in self.tree_sprites:
-                if tree.rect.x == tree_x and tree.rect.y == tree_y:
-                    apple = Generic(
-                        pos=(tree.rect.x + apple_dx, tree.rect.y + apple_dy),
-                        surf=tree.apple_surf,
-                        groups=[tree.apple_sprites, self.all_sprites],
-                        z=LAYERS['fruit']
-                    )
+
+        # 玩家可能被移到了别处：新位置周围的块（围栏、墙）必须在下一帧之前就位
+        self.chunks.load_now(self.player.rect.center)
 
     def load(self, slot):
+        self.dirty.thaw()
         data = None
         if self.cloud_system:
             data = self.load_cloud(slot)
@@ -246,6 +245,13 @@ class Level:
             data = self.load_local(slot)
         if data:
             self.apply_game_state(data)
+        self.quality.reset()
+
+    def teardown(self):
+        """登出后换新关卡前调用：丢掉这个账号未写出的云存档，清空全局计时器里旧关卡的回调"""
+        if self.cloud_system:
+            self.cloud_system.close()
+        timers.clear()
 
     def save(self, slot):
         """通用保存接口：根据 save_mode 调用本地或云端存档"""
@@ -254,37 +260,87 @@ class Level:
         else:
             self.save_local(slot)
 
+    def is_frozen(self):
+        """商店或暂停菜单打开且不在睡觉时，世界画面保持不变"""
+        return (self.shop_active or self.pause_menu.is_open) and not self.player.sleep
+
+    def draw_ui(self):
+        rects = []
+        if self.shop_active:
+            rects += self.menu.draw()
+        rects += self.pause_menu.draw(self.display_surface)
+        rects += self.overlay.display()
+        return rects
+
+    def run_frozen(self, dt):
+        if self.shop_active:
+            self.menu.input()
+        self.pause_menu.update(dt)
+
+        if not self.dirty.active:
+            # 静止的第一帧：完整绘制一次，并保存界面下方的世界画面
+            self.display_surface.fill('black')
+            self.all_sprites.custom_draw(self.player)
+            self.dirty.freeze()
+            self.dirty.track(self.draw_ui())
+            self.sky.display(0)
+            self.dirty_rects = None
+        else:
+            self.dirty_rects = self.dirty.redraw(self.draw_ui, self.sky.tint)
+
     def run(self, dt):
-        self.display_surface.fill('black')
-        self.all_sprites.custom_draw(self.player)
+        # 所有计时器（工具、菜单、粒子、雨滴寿命）每帧统一推进一次
+        timers.update()
+        if self.is_frozen():
+            self.run_frozen(dt)
+        else:
+            self.dirty.thaw()
+            self.dirty_rects = None
+
+            self.display_surface.fill('black')
+            self.all_sprites.custom_draw(self.player)
 
-        if not self.pause_menu.is_open:
             if self.shop_active:
-                self.menu.update()
-            else:
+                self.menu.input()
+            elif not self.pause_menu.is_open:
+                self.chunks.update(self.player.rect.center)
+                self.animations.update(dt)
                 self.all_sprites.update(dt)
+                self.rain.update_drops(dt)
                 self.plant_collision()
 
-        self.pause_menu.update(dt)
-        self.pause_menu.draw(self.display_surface)
+            self.pause_menu.update(dt)
+            self.draw_ui()
 
-        if self.shop_active:
-            self.menu.update()
-        else:
-            self.all_sprites.update(dt)
-            self.plant_collision()
+            if self.raining and not self.shop_active:
+                self.rain.update()
 
-        self.overlay.display()
-        if self.raining and not self.shop_active:
-            self.rain.update()
-        self.sky.display(dt)
+            # 睡觉的渐暗与天空颜色合成为一次整屏相乘
+            if self.player.sleep:
+                self.transition.play()
+            self.sky.display(dt, self.transition.color)
+
+        # 云端分片读档：远处的土壤块陆续到达
+        if self.cloud_system:
+            soil = self.cloud_system.poll_load()
+            if soil:
+                self.soil_layer.load_state_dict(soil)
 
         # 自动云存档
         if self.cloud_system:
-            self.cloud_system.auto_save_if_due(self.get_game_state())
+            self.cloud_system.auto_save_if_due(self.get_game_state)
 
-        if self.player.sleep:
-            self.transition.play()
+
+def first_at_layer(drawables, z):
+    """按 (z, centery) 排好序的列表中第一个层级 >= z 的下标（二分查找）"""
+    lo, hi = 0, len(drawables)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if drawables[mid].z < z:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
 
 
 class CameraGroup(pygame.sprite.Group):
@@ -292,13 +348,40 @@ class CameraGroup(pygame.sprite.Group):
         super().__init__()
         self.display_surface = pygame.display.get_surface()
         self.offset = pygame.math.Vector2()
+        # 轻量实体（瓦片、苹果、雨滴）与精灵一起绘制，但不参与 update
+        self.entities = EntityGroup()
+        self.ground = None
+        self.decals = None  # 雨水溅痕：按层级插在精灵之间，一次性绘制
+        self.viewport = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        # 跨帧复用的 [图像, [x, y]] 缓冲，每帧原地改写后一次性 blits
+        self.batch = []
 
     def custom_draw(self, player):
-        self.offset.x = player.rect.centerx - SCREEN_WIDTH / 2
-        self.offset.y = player.rect.centery - SCREEN_HEIGHT / 2
-        for layer in LAYERS.values():
-            for spr in sorted(self.sprites(), key=lambda s: s.rect.centery):
-                if spr.z == layer:
-                    offset_rect = spr.rect.copy()
-                    offset_rect.center -= self.offset
-                    self.display_surface.blit(spr.image, offset_rect)
+        self.offset.x = player.rect.centerx - self.viewport.width // 2
+        self.offset.y = player.rect.centery - self.viewport.height // 2
+        ox, oy = int(self.offset.x), int(self.offset.y)
+        self.viewport.topleft = (ox, oy)
+        if self.ground:
+            self.ground.view(self.viewport)
+
+        drawables = self.sprites()
+        drawables.extend(self.entities.entities)
+        drawables.sort(key=lambda s: (s.z, s.rect.centery))
+
+        batch = self.batch
+        count = len(drawables)
+        if len(batch) < count:
+            batch.extend([None, [0, 0]] for _ in range(count - len(batch)))
+        for entry, spr in zip(batch, drawables):
+            entry[0] = spr.image
+            pos = entry[1]
+            rect = spr.rect
+            pos[0] = rect.x - ox
+            pos[1] = rect.y - oy
+        if self.decals:
+            split = first_at_layer(drawables, self.decals.z)
+            self.display_surface.blits(islice(batch, split), doreturn=False)
+            self.display_surface.blits(self.decals.entries(ox, oy), doreturn=False)
+            self.display_surface.blits(islice(batch, split, count), doreturn=False)
+        else:
+            self.display_surface.blits(islice(batch, count), doreturn=False)
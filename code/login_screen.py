@@ -3,7 +3,7 @@
 import pygame, random, re, sys
 from pygame import Rect
 from firebase_auth import FirebaseAuth
-from support import resource_path
+from support import resource_path, render_text
 
 class LoginScreen:
     def __init__(self, screen: pygame.Surface, auth: FirebaseAuth):
@@ -11,10 +11,10 @@ class LoginScreen:
         self.auth = auth
         sw, sh = screen.get_size()
 
-        # 背景资源
-        self.bg = pygame.image.load(resource_path("images/environment/login1.png")).convert()
-        self.bg = pygame.transform.scale(self.bg, (sw, sh))
-        
+        # 背景资源（按实际窗口尺寸缩放，见 build_backdrop）
+        self.bg_img = pygame.image.load(resource_path("images/environment/login1.png")).convert()
+        self.backdrop = None
+
         # 云朵动画
         self.cloud_img = pygame.image.load(resource_path("images/environment/cloud0.png")).convert_alpha()
         self.clouds = [{
@@ -24,10 +24,17 @@ class LoginScreen:
             "scale": random.uniform(0.9, 1.1)
         } for _ in range(4)]
 
-        # 字体配置
-        self.title_font = pygame.font.Font(resource_path("font/PixeloidSans.ttf"), 60)
-        self.ui_font = pygame.font.Font(resource_path("font/PixeloidSans.ttf"), 28)
-        self.small_font = pygame.font.Font(resource_path("font/PixeloidSans.ttf"), 20)
+        # 每朵云只缩放一次，并裁掉透明边缘；offset 为裁剪后相对原图的位置
+        for c in self.clouds:
+            img = pygame.transform.rotozoom(self.cloud_img, 0, c["scale"])
+            bounds = img.get_bounding_rect()
+            c["img"] = img.subsurface(bounds).copy()
+            c["offset"] = bounds.topleft
+
+        # 字体大小
+        self.title_size = 60
+        self.ui_size = 28
+        self.small_size = 20
 
         # 输入框配置
         self.inputs = [
@@ -60,48 +67,62 @@ class LoginScreen:
         }
 
         # 错误提示
-        self.error_msg = ""
+        self.error_msg = auth.notice
         self.cursor_visible = True
         self.cursor_timer = 0
 
+        # 上一帧提交过的变化区域；None 表示下一帧整屏提交
+        self.last_rects = None
+
+    def build_backdrop(self, size):
+        """背景、标题和输入框标签只合成一次"""
+        sw, sh = size
+        self.backdrop = pygame.transform.scale(self.bg_img, size)
+
+        # 绘制标题（云朵只出现在画面下方，不会挡住这些静态文字）
+        title = render_text("Sow & Gain", self.title_size, (30,30,30))
+        self.backdrop.blit(title, (sw//2-title.get_width()//2, 100))
+
+        # 绘制标签
+        for inp in self.inputs:
+            label = render_text(inp["label"]+":", self.small_size, (255,255,255))
+            self.backdrop.blit(label, (inp["rect"].x-120, inp["rect"].centery-8))
+
     def draw(self, dt):
+        """绘制登录界面，返回本帧会变化的区域（标题、标签等静态内容不计入）"""
         sw, sh = self.screen.get_size()
-        self.screen.blit(self.bg, (0,0))
-        
+        if self.backdrop is None or self.backdrop.get_size() != (sw, sh):
+            self.build_backdrop((sw, sh))
+            self.last_rects = None
+        self.screen.blit(self.backdrop, (0,0))
+        rects = []
+
         # 绘制云朵动画
         for c in self.clouds:
             c["x"] += c["speed"] * dt
             if c["x"] > sw+50: c["x"] = -200
-            img = pygame.transform.rotozoom(self.cloud_img, 0, c["scale"])
-            self.screen.blit(img, (c["x"], c["y"]))
-
-        # 绘制标题
-        title = self.title_font.render("Sow & Gain", True, (30,30,30))
-        self.screen.blit(title, (sw//2-title.get_width()//2, 100))
+            ox, oy = c["offset"]
+            rects.append(self.screen.blit(c["img"], (c["x"]+ox, c["y"]+oy)))
 
         # 绘制输入框
         for inp in self.inputs:
             # 输入框边框
             border_color = (0, 120, 200) if inp["active"] else (150, 150, 150)
-            pygame.draw.rect(self.screen, border_color, inp["rect"], 2, border_radius=5)
+            rects.append(pygame.draw.rect(self.screen, border_color, inp["rect"], 2, border_radius=5))
             
             # 输入文本
             display_text = inp["txt"]
             if inp["label"] == "Password":
                 display_text = "*" * len(display_text)
-            text_surf = self.ui_font.render(display_text, True, (255,255,255))
-            self.screen.blit(text_surf, (inp["rect"].x+10, inp["rect"].y+10))
-
-            # 绘制标签
-            label = self.small_font.render(inp["label"]+":", True, (255,255,255))
-            self.screen.blit(label, (inp["rect"].x-120, inp["rect"].centery-8))
+            text_surf = render_text(display_text, self.ui_size, (255,255,255))
+            rects.append(self.screen.blit(text_surf, (inp["rect"].x+10, inp["rect"].y+10)))
 
             # 光标效果
             if inp["active"] and self.cursor_visible:
                 cursor_x = inp["rect"].x + 10 + text_surf.get_width() + 2
-                pygame.draw.line(self.screen, (100,100,100),
+                rects.append(pygame.draw.line(self.screen, (100,100,100),
                                (cursor_x, inp["rect"].y+10),
-                               (cursor_x, inp["rect"].bottom-10), 2)
+                               (cursor_x, inp["rect"].bottom-10), 2))
 
         # 绘制按钮
         mouse_pos = pygame.mouse.get_pos()
@@ -112,17 +133,19 @@ class LoginScreen:
                 color = [min(c+30, 255) for c in color]
             
             # 按钮主体
-            pygame.draw.rect(self.screen, color, btn["rect"], border_radius=8)
+            rects.append(pygame.draw.rect(self.screen, color, btn["rect"], border_radius=8))
             
             # 按钮文字
-            text = self.ui_font.render(btn["text"], True, (255,255,255))
+            text = render_text(btn["text"], self.ui_size, (255,255,255))
             text_rect = text.get_rect(center=btn["rect"].center)
             self.screen.blit(text, text_rect)
 
         # 错误提示
         if self.error_msg:
-            error_surf = self.small_font.render(self.error_msg, True, (200,30,30))
-            self.screen.blit(error_surf, (sw//2-error_surf.get_width()//2, sh//2+140))
+            error_surf = render_text(self.error_msg, self.small_size, (200,30,30))
+            rects.append(self.screen.blit(error_surf, (sw//2-error_surf.get_width()//2, sh//2+140)))
+
+        return rects
 
     def validate_inputs(self):
         """验证输入有效性"""
@@ -168,6 +191,10 @@ class LoginScreen:
         clock = pygame.time.Clock()
         while True:
             dt = clock.tick(60)/1000
+
+            # 后台恢复了上次的会话
+            if self.auth.user:
+                return True
             
             # 光标闪烁逻辑
             self.cursor_timer += dt
@@ -210,6 +237,10 @@ class LoginScreen:
                         elif event.unicode.isprintable():
                             active_inp["txt"] += event.unicode
 
-            # 绘制界面
-            self.draw(dt)
-            pygame.display.update()
+            # 绘制界面，第一帧之后只提交变化区域（含上一帧的位置）
+            rects = self.draw(dt)
+            if self.last_rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(self.last_rects + rects)
+            self.last_rects = rects
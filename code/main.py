@@ -1,4 +1,5 @@
 import pygame, sys
+import profiler
 from settings import SCREEN_WIDTH, SCREEN_HEIGHT
 from firebase_auth import FirebaseAuth
 from login_screen import LoginScreen
@@ -13,6 +14,15 @@ class Game:
 
         # 登录/注册
         self.auth = FirebaseAuth()
+        self.auth.restore_session()  # 后台恢复上次的登录，成功后登录界面自动放行
+        self.level = None
+        self.start()
+
+    def start(self):
+        """显示登录界面，登录后按该账号重新建关卡（启动时、登出或会话失效后）"""
+        if self.level:
+            self.level.teardown()
+            self.level = None
         login = LoginScreen(self.screen, self.auth)
         ok    = login.run()
         if not ok:
@@ -22,9 +32,16 @@ class Game:
 
         # 启动游戏，云存档模式
         self.level = Level(auth=self.auth, save_mode="cloud")
+        # 登录和建关卡的耗时不能算进第一帧
+        self.clock.tick()
+        self.level.quality.reset()
 
     def run(self):
         while True:
+            # 主动登出，或后台刷新发现会话已失效
+            if self.auth.user is None:
+                self.start()
+
             for e in pygame.event.get():
                 if e.type == pygame.QUIT:
                     pygame.quit()
@@ -36,6 +53,10 @@ class Game:
                     if e.key == pygame.K_ESCAPE:
                         self.level.pause_menu.toggle_menu()
 
+                    # F3 → 打印云端请求耗时（profiler.timings）
+                    if e.key == pygame.K_F3:
+                        print(profiler.report())
+
                     # ✅ 1/2/3 → local save
                     if e.key in (pygame.K_1, pygame.K_2, pygame.K_3):
                         slot = e.key - pygame.K_1
@@ -47,8 +68,15 @@ class Game:
                         self.level.load(slot)
 
             dt = self.clock.tick(60) / 1000
+            # 上一帧不含等待的实际耗时，交给画质调节器
+            self.level.quality.frame(self.clock.get_rawtime())
             self.level.run(dt)
-            pygame.display.update()
+
+            # 商店/暂停等静止画面只提交变化的区域
+            if self.level.dirty_rects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(self.level.dirty_rects)
 
 if __name__ == "__main__":
     Game().run()
@@ -1,7 +1,7 @@
 import pygame
 from settings import *
 from timer import Timer
-from support import resource_path
+from support import render_text
 
 class Menu:
 	def __init__(self, player, toggle_menu):
@@ -10,7 +10,7 @@ class Menu:
 		self.player = player
 		self.toggle_menu = toggle_menu
 		self.display_surface = pygame.display.get_surface()
-		self.font = pygame.font.Font(resource_path('font/PixeloidSans.ttf'), 30)
+		self.font_size = 30
 
 		# options
 		self.width = 400
@@ -27,11 +27,12 @@ class Menu:
 		self.timer = Timer(200)
 
 	def display_money(self):
-		text_surf = self.font.render(f'${self.player.money}', False, 'Black')
+		text_surf = render_text(f'${self.player.money}', self.font_size, 'Black', False)
 		text_rect = text_surf.get_rect(midbottom = (SCREEN_WIDTH / 2,SCREEN_HEIGHT - 20))
 
-		pygame.draw.rect(self.display_surface,'White',text_rect.inflate(10,10),0,4)
+		bg_rect = pygame.draw.rect(self.display_surface,'White',text_rect.inflate(10,10),0,4)
 		self.display_surface.blit(text_surf,text_rect)
+		return bg_rect
 
 	def setup(self):
 
@@ -44,7 +45,7 @@ class Menu:
 		self.sell_border = len(self.sell_items) - 1
 
 		for item in self.options:
-			text_surf = self.font.render(item, False, 'Black')
+			text_surf = render_text(item, self.font_size, 'Black', False)
 			self.text_surfs.append(text_surf)
 			self.total_height += text_surf.get_height() + (self.padding * 2)
 
@@ -53,12 +54,11 @@ class Menu:
 		self.main_rect = pygame.Rect(SCREEN_WIDTH / 2 - self.width / 2,self.menu_top,self.width,self.total_height)
 
 		# buy / sell text surface
-		self.buy_text = self.font.render('buy',False,'Black')
-		self.sell_text =  self.font.render('sell',False,'Black')
+		self.buy_text = render_text('buy', self.font_size, 'Black', False)
+		self.sell_text =  render_text('sell', self.font_size, 'Black', False)
 
 	def input(self):
 		keys = pygame.key.get_pressed()
-		self.timer.update()
 
 		if keys[pygame.K_ESCAPE]:
 			self.toggle_menu()
@@ -110,7 +110,7 @@ class Menu:
 		self.display_surface.blit(text_surf, text_rect)
 
 		# amount
-		amount_surf = self.font.render(str(amount), False, 'Black')
+		amount_surf = render_text(str(amount), self.font_size, 'Black', False)
 		amount_rect = amount_surf.get_rect(midright = (self.main_rect.right - 20,bg_rect.centery))
 		self.display_surface.blit(amount_surf, amount_rect)
 
@@ -124,9 +124,11 @@ class Menu:
 				pos_rect = self.buy_text.get_rect(midleft = (self.main_rect.left + 150,bg_rect.centery))
 				self.display_surface.blit(self.buy_text,pos_rect)
 
-	def update(self):
-		self.input()
-		self.display_money()
+		return bg_rect
+
+	def draw(self):
+		"""绘制商店界面，返回绘制区域（供静止画面的脏矩形更新使用）"""
+		rects = [self.display_money()]
 
 		# option list
 		self.sell_items = {k:v for k,v in self.player.item_inventory.items() if k not in ['axe','hoe','water']}
@@ -137,7 +139,7 @@ class Menu:
 		self.text_surfs = []
 		self.total_height = 0
 		for item in self.options:
-			text_surf = self.font.render(item, False, 'Black')
+			text_surf = render_text(item, self.font_size, 'Black', False)
 			self.text_surfs.append(text_surf)
 			self.total_height += text_surf.get_height() + (self.padding * 2)
 		self.total_height += (len(self.text_surfs) - 1) * self.space
@@ -148,4 +150,5 @@ class Menu:
 			top = self.main_rect.top + text_index * (text_surf.get_height() + (self.padding * 2) + self.space)
 			amount_list = list(self.sell_items.values()) + list(self.buy_seeds.values())
 			amount = amount_list[text_index]
-			self.show_entry(text_surf, amount, top, self.index == text_index)
+			rects.append(self.show_entry(text_surf, amount, top, self.index == text_index))
+		return rects
@@ -1,7 +1,7 @@
 import pygame, sys
 from random import randint
 from settings import *
-from support import resource_path
+from support import render_text
 
 class PixelButton:
     def __init__(self, x, y, text, callback):
@@ -18,41 +18,54 @@ class PixelButton:
             x = randint(2, BUTTON_WIDTH-3)
             y = randint(2, BUTTON_HEIGHT-3)
             self.texture.set_at((x,y), UI_COLORS['brown_dark'])
+
+        # 缓存的按钮外观 {hovered: Surface}
+        self.surfs = {}
             
-    def draw(self, surface):
-        if not self.visible:
-            return
-            
+    def render(self, hovered):
+        """把按钮画到一张带透明通道的面上，draw 时只需一次 blit"""
+        surf = pygame.Surface((BUTTON_WIDTH+4, BUTTON_HEIGHT+4), pygame.SRCALPHA)
+        rect = pygame.Rect(2, 2, BUTTON_WIDTH, BUTTON_HEIGHT)
+
         # 绘制边框（深棕色）
-        pygame.draw.rect(surface, UI_COLORS['brown_dark'], 
-                       self.rect.inflate(4,4), 2, border_radius=3)
-        
+        pygame.draw.rect(surf, UI_COLORS['brown_dark'],
+                       surf.get_rect(), 2, border_radius=3)
+
         # 填充底色（浅棕色）
-        fill_rect = self.rect.copy()
-        if self.hovered:
+        if hovered:
             fill_color = UI_COLORS['beige']  # 悬停时使用米色
         else:
             fill_color = UI_COLORS['brown_light']
-            
-        pygame.draw.rect(surface, fill_color, fill_rect, border_radius=3)
-        
+
+        pygame.draw.rect(surf, fill_color, rect, border_radius=3)
+
         # 添加纹理
-        surface.blit(self.texture, self.rect.topleft, special_flags=pygame.BLEND_RGBA_MULT)
-        
+        surf.blit(self.texture, rect.topleft, special_flags=pygame.BLEND_RGBA_MULT)
+
         # 绘制文字（带1像素阴影）
-        font = pygame.font.Font(resource_path('font/PixeloidSans.ttf'), UI_FONT_SIZE)  # 使用像素字体
-        text_surf = font.render(self.text, True, UI_COLORS['brown_dark'])
-        text_rect = text_surf.get_rect(center=(self.rect.centerx+1, self.rect.centery+1))
-        surface.blit(text_surf, text_rect)
-        
-        text_surf = font.render(self.text, True, UI_COLORS['text'])
-        text_rect = text_surf.get_rect(center=self.rect.center)
-        surface.blit(text_surf, text_rect)
-        
+        text_surf = render_text(self.text, UI_FONT_SIZE, UI_COLORS['brown_dark'])
+        text_rect = text_surf.get_rect(center=(rect.centerx+1, rect.centery+1))
+        surf.blit(text_surf, text_rect)
+
+        text_surf = render_text(self.text, UI_FONT_SIZE, UI_COLORS['text'])
+        text_rect = text_surf.get_rect(center=rect.center)
+        surf.blit(text_surf, text_rect)
+
         # 添加高光线（顶部1像素）
-        pygame.draw.line(surface, UI_COLORS['beige'],
-                        (self.rect.left+2, self.rect.top+1),
-                        (self.rect.right-2, self.rect.top+1), 1)
+        pygame.draw.line(surf, UI_COLORS['beige'],
+                        (rect.left+2, rect.top+1),
+                        (rect.right-2, rect.top+1), 1)
+        return surf
+
+    def draw(self, surface):
+        if not self.visible:
+            return
+
+        # 普通/悬停两种外观各渲染一次
+        surf = self.surfs.get(self.hovered)
+        if surf is None:
+            surf = self.surfs[self.hovered] = self.render(self.hovered)
+        return surface.blit(surf, (self.rect.x-2, self.rect.y-2))
 
     def handle_event(self, event):
         if not self.visible:
@@ -81,6 +94,7 @@ class PauseMenu:
         buttons_data = [
             ("Save", self.save),
             ("Load", self.load),
+            ("Logout", self.logout),
             ("Quit", self.quit)
         ]
         for i, (text, cb) in enumerate(buttons_data):
@@ -104,6 +118,12 @@ class PauseMenu:
         self.level.load(0)  # 默认从槽位0加载
         self.toggle_menu()
         
+    def logout(self):
+        # 登出后主循环会回到登录界面，可以换账号
+        self.toggle_menu()
+        if self.level.auth:
+            self.level.auth.sign_out()
+
     def quit(self):
         pygame.quit()
         sys.exit()
@@ -127,9 +147,10 @@ class PauseMenu:
             btn.visible = self.is_open
 
     def draw(self, surface):
-        self.main_button.draw(surface)
+        rects = [self.main_button.draw(surface)]
         for btn in self.buttons:
-            btn.draw(surface)
+            rects.append(btn.draw(surface))
+        return [rect for rect in rects if rect]
 
     def handle_event(self, event):
         self.main_button.handle_event(event)
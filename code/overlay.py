@@ -1,14 +1,14 @@
 import pygame
 from settings import *
 from player import *
-from support import resource_path
+from support import resource_path, render_text
 
 class Overlay:
 	#change
 	def __init__(self, player):
 		self.display_surface = pygame.display.get_surface()
 		self.player = player
-		self.font = pygame.font.Font(resource_path('font/PixeloidSans.ttf'), 20)
+		self.font_size = 20
 		self.items = ['hoe', 'axe', 'water', 'corn', 'tomato'] 
 		self.items = player.inventory
 
@@ -27,8 +27,23 @@ class Overlay:
 		self.border_color = (139, 69, 19)  # 棕
 		self.selected_color = (0, 0, 255)  # 蓝
 
+		# retained HUD surfaces, rebuilt only when what they show changes
+		self.toolbar_state = None
+		self.toolbar_surf = None
+		self.toolbar_rect = None
+		self.money_state = None
+		self.money_surf = None
+		self.money_rect = None
+
+	def item_count(self, item):
+		if item in self.player.seed_inventory:  # 如果是种子
+			return self.player.seed_inventory[item]
+		elif item in ['wood', 'apple']:  # 仅显示这些可交易物品
+			return self.player.item_inventory.get(item, 0)
+		return ''  # 默认值
+
 	#change
-	def display(self):
+	def build_toolbar(self, counts, selected_index):
 
 		# # tool
 		# tool_surf = self.tools_surf[self.player.selected_tool]
@@ -44,47 +59,63 @@ class Overlay:
 		total_w = self.slot_size * n
 		start_x = (SCREEN_WIDTH - total_w) // 2
 		y = SCREEN_HEIGHT - self.slot_size
-		self.display_money()
+
+		# 图标可能比格子大，缓存面要把溢出的部分也包进去
+		slot_rects = [pygame.Rect(start_x + idx * self.slot_size, y, self.slot_size, self.slot_size) for idx in range(n)]
+		icon_rects = [self.item_surf[item].get_rect(center = slot_rect.center) for item, slot_rect in zip(self.items, slot_rects)]
+		self.toolbar_rect = slot_rects[0].unionall(slot_rects + icon_rects)
+		surf = pygame.Surface(self.toolbar_rect.size, pygame.SRCALPHA)
+		offset = (-self.toolbar_rect.x, -self.toolbar_rect.y)
 
 		for idx, item in enumerate(self.items):
-			x = start_x + idx * self.slot_size
-			slot_rect = pygame.Rect(x, y, self.slot_size, self.slot_size)
+			slot_rect = slot_rects[idx].move(offset)
 
 			# 背景和边框
-			pygame.draw.rect(self.display_surface, self.bg_color, slot_rect, 0)
-			pygame.draw.rect(self.display_surface, self.border_color, slot_rect, 2)
+			pygame.draw.rect(surf, self.bg_color, slot_rect, 0)
+			pygame.draw.rect(surf, self.border_color, slot_rect, 2)
 
 			# 图标居中
-			icon = self.item_surf[item]
-			icon_rect = icon.get_rect(center=slot_rect.center)
-			self.display_surface.blit(icon, icon_rect)
-
-			if item in self.player.seed_inventory:  # 如果是种子
-				count = self.player.seed_inventory[item]
-			elif item in ['wood', 'apple']:  # 仅显示这些可交易物品
-				count = self.player.item_inventory.get(item, 0)
-			else:
-				count = ''  # 默认值
-				
+			surf.blit(self.item_surf[item], icon_rects[idx].move(offset))
+
 			# 渲染文本（白色字体，右下角偏移 5 像素）
-			text_surf = self.font.render(str(count), True, 'white')
-			text_rect = text_surf.get_rect(
-				bottomright=slot_rect.move(-5, -5).bottomright
-			)
-			self.display_surface.blit(text_surf, text_rect)
-        
+			if counts[idx] != '':
+				text_surf = render_text(str(counts[idx]), self.font_size, 'white')
+				text_rect = text_surf.get_rect(
+					bottomright=slot_rect.move(-5, -5).bottomright
+				)
+				surf.blit(text_surf, text_rect)
+
 			# 选中高亮
-			if idx == self.player.selected_index:
-				pygame.draw.rect(self.display_surface, self.selected_color,
+			if idx == selected_index:
+				pygame.draw.rect(surf, self.selected_color,
 								 slot_rect.inflate(-4, -4), 3)
 
-	def display_money(self):
-		text_surf = self.font.render(f'${self.player.money}', True, 'gold')
+		self.toolbar_surf = surf
+
+	def build_money(self, money):
+		text_surf = render_text(f'${money}', self.font_size, 'gold')
 		text_rect = text_surf.get_rect(topright=(SCREEN_WIDTH - 20, 20))
-		
+
 		# background
-		bg_rect = text_rect.inflate(20, 10)
-		pygame.draw.rect(self.display_surface, UI_COLORS['brown_dark'], bg_rect, 0, 3)
-		pygame.draw.rect(self.display_surface, 'gold', bg_rect, 2, 3)
-		
-		self.display_surface.blit(text_surf, text_rect)
\ No newline at end of file
+		self.money_rect = text_rect.inflate(20, 10)
+		surf = pygame.Surface(self.money_rect.size, pygame.SRCALPHA)
+		bg_rect = surf.get_rect()
+		pygame.draw.rect(surf, UI_COLORS['brown_dark'], bg_rect, 0, 3)
+		pygame.draw.rect(surf, 'gold', bg_rect, 2, 3)
+
+		surf.blit(text_surf, text_surf.get_rect(center = bg_rect.center))
+		self.money_surf = surf
+
+	def display(self):
+		state = (tuple(self.item_count(item) for item in self.items), self.player.selected_index)
+		if state != self.toolbar_state:
+			self.toolbar_state = state
+			self.build_toolbar(*state)
+
+		if self.player.money != self.money_state:
+			self.money_state = self.player.money
+			self.build_money(self.money_state)
+
+		self.display_surface.blit(self.money_surf, self.money_rect)
+		self.display_surface.blit(self.toolbar_surf, self.toolbar_rect)
+		return [self.money_rect, self.toolbar_rect]
@@ -4,6 +4,7 @@ from support import import_folder
 from timer import Timer
 from support import resource_path
 from sprites import Tree
+from audio import audio
 
 class Player(pygame.sprite.Sprite):
     @property
@@ -16,7 +17,7 @@ class Player(pygame.sprite.Sprite):
         self.rect.center = self.pos
         self.hitbox.center = self.pos
 
-    def __init__(self, pos, group, collision_sprites, tree_sprites, interaction_sprites, soil_layer, toggle_shop):
+    def __init__(self, pos, group, collision_sprites, collision_rects, tree_sprites, interaction_sprites, soil_layer, toggle_shop, world):
         super().__init__(group)
 
         # 角色动画与状态
@@ -35,6 +36,7 @@ class Player(pygame.sprite.Sprite):
         # 碰撞
         self.hitbox = self.rect.copy().inflate(-126, -70)
         self.collision_sprites = collision_sprites
+        self.collision_rects = collision_rects
 
         # 定时器：统一使用和切换
         self.timers = {
@@ -66,15 +68,11 @@ class Player(pygame.sprite.Sprite):
         # 交互与场景引用
         self.tree_sprites = tree_sprites
         self.interaction = interaction_sprites
+        self.world = world
         self.sleep = False
         self.soil_layer = soil_layer
         self.toggle_shop = toggle_shop
 
-        # 声音
-        self.watering = pygame.mixer.Sound(resource_path('audio/water.mp3'))
-        self.watering.set_volume(0.2)
-
-
     def use_item(self):
         # 根据当前高亮项执行动作
         if self.selected_index < len(self.tools):
@@ -90,14 +88,15 @@ class Player(pygame.sprite.Sprite):
         if self.selected_tool == 'hoe':
             self.soil_layer.get_hit(self.target_pos)
         elif self.selected_tool == 'axe':
-            for sprite in self.tree_sprites.sprites():
-                if isinstance(sprite, Tree) and sprite.rect.collidepoint(self.target_pos):  # 添加类型检查
+            for sprite in self.world.query_point(self.target_pos, 'tree'):
+                if isinstance(sprite, Tree):  # 添加类型检查
                     sprite.damage()
                     if not sprite.alive:
                         self.tree_sprites.remove(sprite)
+                        self.world.remove(sprite)
         elif self.selected_tool == 'water':
             self.soil_layer.water(self.target_pos)
-            self.watering.play()
+            audio.play('water')
 
     def use_seed(self):
         if self.seed_inventory[self.selected_seed] > 0:
@@ -170,9 +169,9 @@ class Player(pygame.sprite.Sprite):
 
             # 交互
             if keys[pygame.K_TAB]:
-                collided = pygame.sprite.spritecollide(self, self.interaction, False)
-                if collided:
-                    if collided[0].name == 'Trader':
+                target = self.world.nearest(self.rect.center, 'interaction', self.rect)
+                if target:
+                    if target.name == 'Trader':
                         self.toggle_shop()
                     else:
                         self.status = 'left_idle'
@@ -189,25 +188,24 @@ class Player(pygame.sprite.Sprite):
             else:
                 self.status = self.status.split('_')[0] + '_idle'
 
-    def update_timers(self):
-        for t in self.timers.values():
-            t.update()
-
     def collision(self, direction):
-        for sprite in self.collision_sprites.sprites():
-            if hasattr(sprite, 'hitbox') and sprite.hitbox.colliderect(self.hitbox):
+        # 静态碰撞层是合并后的矩形，先用 collidelistall 筛出相交的几个
+        hitboxes = [self.collision_rects[i] for i in self.hitbox.collidelistall(self.collision_rects)]
+        hitboxes += [sprite.hitbox for sprite in self.collision_sprites.sprites() if hasattr(sprite, 'hitbox')]
+        for hitbox in hitboxes:
+            if hitbox.colliderect(self.hitbox):
                 if direction == 'horizontal':
                     if self.direction.x > 0:
-                        self.hitbox.right = sprite.hitbox.left
+                        self.hitbox.right = hitbox.left
                     if self.direction.x < 0:
-                        self.hitbox.left = sprite.hitbox.right
+                        self.hitbox.left = hitbox.right
                     self.rect.centerx = self.hitbox.centerx
                     self.pos.x = self.hitbox.centerx
                 else:
                     if self.direction.y > 0:
-                        self.hitbox.bottom = sprite.hitbox.top
+                        self.hitbox.bottom = hitbox.top
                     if self.direction.y < 0:
-                        self.hitbox.top = sprite.hitbox.bottom
+                        self.hitbox.top = hitbox.bottom
                     self.rect.centery = self.hitbox.centery
                     self.pos.y = self.hitbox.centery
 
@@ -226,7 +224,6 @@ class Player(pygame.sprite.Sprite):
     def update(self, dt):
         self.input()
         self.get_status()
-        self.update_timers()
         self.get_target_pos()
         self.move(dt)
         self.animate(dt)
@@ -234,8 +231,8 @@ class Player(pygame.sprite.Sprite):
     def save_player_data(self):
         return {
             "pos": tuple(self.pos),
-            "inventory": self.item_inventory,
-            "seeds":     self.seed_inventory,
+            "inventory": dict(self.item_inventory),  # 副本，存档可在后台线程序列化
+            "seeds":     dict(self.seed_inventory),
             "money":     self.money
         }
 
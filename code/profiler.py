@@ -0,0 +1,71 @@
+# profiler.py
+
+import threading
+from collections import deque
+
+
+class FrameStats:
+    """定长窗口内的耗时统计（毫秒）：帧时间或任意命名的计时"""
+
+    def __init__(self, size):
+        self.samples = deque(maxlen=size)
+        self.total = 0.0
+        self.count = 0  # 累计样本数，不受窗口限制
+
+    def add(self, ms):
+        if len(self.samples) == self.samples.maxlen:
+            self.total -= self.samples[0]
+        self.samples.append(ms)
+        self.total += ms
+        self.count += 1
+
+    @property
+    def full(self):
+        return len(self.samples) == self.samples.maxlen
+
+    @property
+    def average(self):
+        return self.total / len(self.samples) if self.samples else 0.0
+
+    @property
+    def median(self):
+        """窗口中位数：个别卡顿（读档、存档快照）不会拉高它"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        mid = len(ordered) // 2
+        return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+    def clear(self):
+        self.samples.clear()
+        self.total = 0.0
+
+
+# 命名计时（毫秒），如每种云端请求的耗时；可从任意线程记录
+timings = {}
+_lock = threading.Lock()
+
+
+def record(name, ms, window=120):
+    with _lock:
+        stats = timings.get(name)
+        if stats is None:
+            stats = timings[name] = FrameStats(window)
+        stats.add(ms)
+
+
+def summary():
+    """{名称: {'avg', 'max', 'last', 'count'}}，统计最近 window 个样本"""
+    with _lock:
+        return {name: {'avg':   stats.average,
+                       'max':   max(stats.samples),
+                       'last':  stats.samples[-1],
+                       'count': stats.count}
+                for name, stats in timings.items() if stats.samples}
+
+
+def report():
+    """summary() 的可读文本，每个计时一行"""
+    lines = [f"{name:<12} avg {s['avg']:7.1f} ms  max {s['max']:7.1f} ms  last {s['last']:7.1f} ms  n={s['count']}"
+             for name, s in sorted(summary().items())]
+    return "\n".join(lines) or "(no timings yet)"
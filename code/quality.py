@@ -0,0 +1,64 @@
+# quality.py
+
+from settings import (QUALITY_PRESETS, QUALITY_DEFAULT, QUALITY_ADAPTIVE, FRAME_BUDGET_MS,
+                      GOVERNOR_WINDOW, GOVERNOR_DOWN, GOVERNOR_UP, GOVERNOR_COOLDOWN)
+from profiler import FrameStats
+
+
+class QualityGovernor:
+    """
+    根据每帧实际工作时间（不含 clock.tick 的等待）在 QUALITY_PRESETS 之间升降档：
+    窗口中位数超出预算的 GOVERNOR_DOWN 就降一档，低于 GOVERNOR_UP 就升一档，切换后冷却几个窗口
+    登录、建关卡、读档之后调用 reset()，那一帧的长耗时不计入统计
+    """
+
+    def __init__(self, level, adaptive=QUALITY_ADAPTIVE):
+        self.level = level
+        self.adaptive = adaptive
+        self.stats = FrameStats(GOVERNOR_WINDOW)
+        self.cooldown = 0
+        self.skip = 0
+        names = [preset['name'] for preset in QUALITY_PRESETS]
+        self.index = names.index(QUALITY_DEFAULT)
+        self.apply()
+
+    @property
+    def preset(self):
+        return QUALITY_PRESETS[self.index]
+
+    def apply(self):
+        self.level.apply_quality(self.preset)
+
+    def set(self, index):
+        index = max(0, min(index, len(QUALITY_PRESETS) - 1))
+        if index != self.index:
+            self.index = index
+            self.apply()
+
+    def reset(self):
+        """丢弃当前窗口，并忽略下一帧（它包含了刚才的阻塞操作）"""
+        self.stats.clear()
+        self.skip = 1
+
+    def frame(self, work_ms):
+        if not self.adaptive:
+            return
+        if self.skip:
+            self.skip -= 1
+            return
+        self.stats.add(work_ms)
+        if not self.stats.full:
+            return
+
+        typical = self.stats.median
+        self.stats.clear()
+        if self.cooldown:
+            self.cooldown -= 1
+            return
+
+        if typical > FRAME_BUDGET_MS * GOVERNOR_DOWN and self.index > 0:
+            self.set(self.index - 1)
+            self.cooldown = GOVERNOR_COOLDOWN
+        elif typical < FRAME_BUDGET_MS * GOVERNOR_UP and self.index < len(QUALITY_PRESETS) - 1:
+            self.set(self.index + 1)
+            self.cooldown = GOVERNOR_COOLDOWN
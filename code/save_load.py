@@ -1,21 +1,75 @@
 # save_load.py
 
 import json
+import os
+import threading
 from pathlib import Path
 
+
+def write_json(path, data, **options):
+    """先写同目录的临时文件再 os.replace：读档的一方要么看到旧文件，要么看到完整的新文件"""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, **options)
+    os.replace(tmp, path)
+
+
+class SaveWorker:
+    """
+    在后台线程里执行 write(slot, game_state)。
+    game_state 必须是快照（Level.get_game_state 的返回值），游戏线程之后的修改不会影响它；
+    写入进行中再提交的同一槽位只保留最新一份。
+    submit 可以换一个 write（比如只写本地缓存），同一槽位的所有写入都在这一个线程里依次进行
+    """
+
+    def __init__(self, write):
+        self.write = write
+        self.pending = {}  # slot -> (write, game_state)
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, slot, game_state, write=None):
+        with self.lock:
+            self.pending[slot] = (write or self.write, game_state)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def cancel(self):
+        """丢掉还没开始的写入；正在进行的那一次照常完成"""
+        with self.lock:
+            self.pending.clear()
+
+    def run(self):
+        while True:
+            with self.lock:
+                if not self.pending:
+                    self.thread = None
+                    return
+                slot = next(iter(self.pending))
+                write, game_state = self.pending.pop(slot)
+            try:
+                write(slot, game_state)
+            except Exception as e:
+                print("❌ 后台存档失败：", e)
+
 class SaveLoadSystem:
     def __init__(self, level):
         self.level = level
         self.save_folder = Path("saves")
         self.save_folder.mkdir(exist_ok=True)
         self.slots = 3
+        self.worker = SaveWorker(self.write_game)
 
     def save_game(self, slot, game_state):
-        """手动本地存档"""
+        """手动本地存档：编码和写文件在后台线程完成"""
+        if 0 <= slot < self.slots:
+            self.worker.submit(slot, game_state)
+
+    def write_game(self, slot, game_state):
         if 0 <= slot < self.slots:
             filename = self.save_folder / f"save_{slot+1}.json"
-            with open(filename, "w", encoding="utf-8") as f:
-                json.dump(game_state, f, ensure_ascii=False, indent=2)
+            write_json(filename, game_state, ensure_ascii=False, indent=2)
             print(f"💾 Local saved {filename}")
 
     def load_game(self, slot):
@@ -1,16 +1,208 @@
 # save_system.py
 
+import json
 import time
-import pyrebase
-from firebase_config import firebase_config
+from cloud import cloud
+from save_load import SaveWorker, write_json
+from settings import TILE_SIZE, CHUNK_SIZE
+
+# 基础分片：加上玩家附近的土壤块就可以开始游戏
+BASE_SHARDS = ('player', 'world', 'trees', 'plants')
+# 分片下载失败后重新提交的次数
+SHARD_RETRIES = 2
+
+
+def node(uid, *path):
+    """数据库路径 users/uid/..."""
+    return "/".join(("users", uid) + path)
+
+
+def split_state(game_state, chunk_size=CHUNK_SIZE):
+    """
+    把存档拆成可以单独读写的分片：player / world / trees / plants / soil/<cx>_<cy>
+    土壤按世界块切成 chunk_size x chunk_size 的小网格
+    """
+    soil = game_state.get('soil') or {}
+    grid = soil.get('grid') or []
+    height = len(grid)
+    width = max([len(row) for row in grid if isinstance(row, (list, tuple))] or [0])
+    shards = {
+        'player': game_state.get('player'),
+        'world':  {'map': game_state.get('map'), 'sky': game_state.get('sky'), 'grid_size': [width, height]},
+        'trees':  game_state.get('trees'),
+        'plants': soil.get('plants', [])
+    }
+    for top in range(0, height, chunk_size):
+        for left in range(0, width, chunk_size):
+            shards[f'soil/{left // chunk_size}_{top // chunk_size}'] = [
+                list(row[left:left + chunk_size]) if isinstance(row, (list, tuple)) else None
+                for row in grid[top:top + chunk_size]]
+    return shards
+
+
+def nest(shards):
+    """{'soil/0_0': v} -> {'soil': {'0_0': v}}，用于整槽覆盖写入"""
+    tree = {}
+    for path, value in shards.items():
+        *parents, leaf = path.split('/')
+        branch = tree
+        for key in parents:
+            branch = branch.setdefault(key, {})
+        branch[leaf] = value
+    return tree
+
+
+def dense(value):
+    """
+    云端数组还原成列表：RTDB 丢掉空列表和 null，稀疏的数组读回来是 {"12": ...}
+    空缺的位置为 None（就是空的行/格子）
+    """
+    if isinstance(value, dict):
+        items = {int(key): child for key, child in value.items() if str(key).isdigit()}
+        out = [None] * (max(items) + 1 if items else 0)
+        for index, child in items.items():
+            out[index] = child
+        return out
+    return value if isinstance(value, list) else []
+
+
+def dense_grid(grid):
+    """土壤网格（或一个土壤块的子网格）的行和格子都还原成列表"""
+    return [dense(row) if row is not None else None for row in dense(grid)]
+
+
+def chunk_key(name):
+    cx, cy = name.split('/')[1].split('_')
+    return int(cx), int(cy)
+
+
+class ShardedLoad:
+    """
+    一个槽位的分片下载：所有分片同时提交给云端传输层的线程池，
+    initial() 只等基础分片和玩家附近的土壤块，其余土壤块由 poll() 陆续交给游戏
+    下载失败和空分片不同（云端会把空的土壤块存成 null）：失败的分片重试 SHARD_RETRIES 次，
+    仍然失败就记入 failed，不交给游戏，那一块保留当前的格子和作物
+    """
+
+    def __init__(self, uid, token, slot, header):
+        self.uid = uid
+        self.token = token
+        self.slot = slot
+        self.header = header
+        self.chunk_size = header.get('chunk_size', CHUNK_SIZE)
+        self.started = time.perf_counter()
+        self.shards = {}      # name -> value（下载成功的）
+        self.failed = set()   # 重试后仍然失败的分片
+        self.attempts = {}
+        names = list(BASE_SHARDS) + [f'soil/{key}' for key in header.get('chunks') or []]
+        self.futures = {name: self.fetch(name) for name in names}
+
+    def fetch(self, name):
+        self.attempts[name] = self.attempts.get(name, 0) + 1
+        return cloud.submit(cloud.get, node(self.uid, "saves", f"slot_{self.slot}", name), self.token)
+
+    def settle(self, name):
+        """取一个分片的下载结果（未完成时阻塞）：成功返回 True；失败则重新提交，次数用完记入 failed"""
+        try:
+            value = self.futures[name].result()
+            self.shards[name] = dense_grid(value) if name.startswith('soil/') else value
+            return True
+        except Exception as e:
+            if self.attempts[name] <= SHARD_RETRIES:
+                print(f"⚠️ 云端分片 {name} 读取失败，重试：", e)
+                self.futures[name] = self.fetch(name)
+            else:
+                print(f"❌ 云端分片 {name} 读取失败：", e)
+                self.failed.add(name)
+            return False
+
+    def take(self, name):
+        """阻塞等待一个分片（包括重试）；成功返回 True"""
+        while name not in self.shards and name not in self.failed:
+            self.settle(name)
+        return name in self.shards
+
+    def initial(self):
+        """
+        基础分片 + 玩家所在及相邻的土壤块；返回可以直接 apply_game_state 的（部分）存档
+        任何基础分片下载失败都放弃这次读档（返回 None），否则缺失的作物列表会清空所有作物
+        """
+        if not all(self.take(name) for name in BASE_SHARDS):
+            return None
+        base = {name: self.shards[name] for name in BASE_SHARDS}
+        if base['player'] is None:
+            return None
+
+        x, y = base['player'].get('pos') or (0, 0)
+        size = self.chunk_size * TILE_SIZE
+        cx, cy = int(x) // size, int(y) // size
+        chunks = {}
+        for name in self.futures:
+            if name.startswith('soil/'):
+                key = chunk_key(name)
+                if abs(key[0] - cx) <= 1 and abs(key[1] - cy) <= 1 and self.take(name):
+                    chunks[key] = self.shards[name]
+
+        world = base['world'] or {}
+        state = {
+            'player': base['player'],
+            'soil':   {'chunks': chunks, 'plants': base['plants'] or []},
+            'trees':  base['trees'] or [],
+        }
+        if world.get('map') is not None:
+            state['map'] = world['map']
+        if world.get('sky') is not None:
+            state['sky'] = world['sky']
+        print(f"☁️ slot_{self.slot} 可以开始游戏：{(time.perf_counter() - self.started) * 1000:.0f} ms")
+        return state
+
+    def poll(self):
+        """已经下载完、还没交给游戏的土壤块；没有则返回 None"""
+        chunks = {}
+        for name, future in self.futures.items():
+            if name not in self.shards and name not in self.failed and future.done():
+                if self.settle(name):
+                    chunks[chunk_key(name)] = self.shards[name]
+        if not chunks:
+            return None
+        return {'chunks': chunks, 'plants': self.shards.get('plants') or []}
+
+    @property
+    def done(self):
+        return len(self.shards) + len(self.failed) == len(self.futures)
+
+    def full_state(self):
+        """所有分片拼回完整存档，用于写本地缓存；只在没有失败分片时调用"""
+        world = self.shards.get('world') or {}
+        width, height = world.get('grid_size') or (0, 0)
+        grid = [[[] for _ in range(width)] for _ in range(height)]
+        for name, sub in self.shards.items():
+            if not name.startswith('soil/') or not isinstance(sub, list):
+                continue
+            cx, cy = chunk_key(name)
+            for dy, row in enumerate(sub):
+                y = cy * self.chunk_size + dy
+                if not isinstance(row, list) or y >= height:
+                    continue
+                for dx, cell in enumerate(row):
+                    x = cx * self.chunk_size + dx
+                    if isinstance(cell, list) and x < width:
+                        grid[y][x] = cell
+        return {
+            'player': self.shards.get('player'),
+            'soil':   {'grid': grid, 'plants': self.shards.get('plants') or []},
+            'trees':  self.shards.get('trees') or [],
+            'map':    world.get('map') or {},
+            'sky':    world.get('sky') or {}
+        }
 
-# 初始化 Pyrebase
-firebase = pyrebase.initialize_app(firebase_config)
-db = firebase.database()
 
 class SaveSystem:
     """
     云端存档系统，用于按 30s 自动上传与按 1/2/3 手动覆盖
+    每个槽位除了存档 saves/slot_N 外，还有一个很小的头 meta/slot_N = {revision, saved_at, ...}；
+    读档先取头，本地缓存的版本不比云端旧时不再下载存档（离线时的存档不会被旧的云端覆盖）
+    存档按分片存放（见 split_state），上传只写有变化的分片，下载并行进行
     """
 
     def __init__(self, auth):
@@ -19,84 +211,222 @@ class SaveSystem:
         """
         self.auth = auth
         self.last_saved = time.time()
+        self.worker = SaveWorker(self.save_game)
+        self.uploaded = {}    # (uid, slot) -> {分片名: 上次上传内容的 hash}
+        self.loading = None   # 正在后台下载的 ShardedLoad
+        self.deferred = set() # 加载期间请求过存档的槽位
+
+    def save_in_background(self, slot, game_state):
+        """把存档快照交给后台线程编码、写本地文件并上传"""
+        if self.loading:
+            # 远处的土壤块还没到，这份快照里它们还是空地：只记下槽位，加载结束后用新快照补存
+            print(f"⏳ 云端存档仍在加载，slot_{slot} 稍后保存")
+            self.deferred.add(slot)
+            return
+        self.submit(slot, game_state)
+
+    def submit(self, slot, game_state):
+        # 账号在提交时确定：登出换号后，排队或正在上传的旧存档不会写到新账号下
+        user = dict(getattr(self.auth, 'user', {}) or {})
+        self.worker.submit(slot, game_state, lambda slot, state: self.save_game(slot, state, user))
+
+    def close(self):
+        """登出 / 换账号时调用：丢掉还没开始的存档和未完成的读档"""
+        self.worker.cancel()
+        self.deferred.clear()
+        self.loading = None
+
+    def flush_deferred(self, get_state):
+        """加载结束后补存加载期间请求过的槽位"""
+        if self.loading or not self.deferred:
+            return
+        game_state = get_state()
+        for slot in sorted(self.deferred):
+            self.submit(slot, game_state)
+        self.deferred.clear()
+        self.last_saved = time.time()
 
-    def save_game(self, slot, game_state):
+    @staticmethod
+    def local_files(slot):
+        return f'save_{slot+1}.json', f'save_{slot+1}.meta.json'
+
+    def read_local(self, slot, uid):
         """
-        立即上传到云端槽 slot，同时覆盖同名本地文件 save_{slot+1}.json
+        返回 (本地存档, 本地头)；存档不存在时为 None，头缺失时为 {}
+        本地缓存属于别的账号（或旧的头没有记录账号）时当作没有本地存档
+        """
+        filename, metaname = self.local_files(slot)
+        try:
+            with open(filename, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None, {}
+        try:
+            with open(metaname, 'r') as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            meta = {}
+        if not isinstance(meta, dict) or meta.get('uid') != uid:
+            print(f"⚠️ 本地 {filename} 不属于当前账号，忽略")
+            return None, {}
+        return data, meta
+
+    def write_local(self, slot, game_state, header, uid, synced):
         """
-        # 先写本地
-        filename = f'save_{slot+1}.json'
-        with open(filename, 'w') as f:
-            import json
-            json.dump(game_state, f, indent=2)
+        本地头 = 云端头 + uid（存档属于哪个账号）+ synced（这份存档是否已在云端）
+        先写存档再写头：中途失败时头缺失，下次读档只会多下载一次
+        """
+        filename, metaname = self.local_files(slot)
+        write_json(filename, game_state, indent=2)
+        write_json(metaname, dict(header, uid=uid, synced=synced))
         print(f"💾 本地已保存 {filename}")
 
-        # 再写云端
-        user = getattr(self.auth, 'user', {}) or {}
+    def mark_synced(self, slot, header, uid):
+        write_json(self.local_files(slot)[1], dict(header, uid=uid, synced=True))
+
+    def save_game(self, slot, game_state, user=None):
+        """
+        立即上传到云端槽 slot，同时覆盖同名本地文件 save_{slot+1}.json
+        user: 提交存档时的登录信息（见 submit），缺省为当前登录的账号
+        """
+        shards = split_state(game_state)
+        header = {
+            'revision':   int(time.time() * 1000),
+            'saved_at':   time.time(),
+            'layout':     'sharded',
+            'chunk_size': CHUNK_SIZE,
+            'chunks':     [name.split('/')[1] for name in shards if name.startswith('soil/')]
+        }
+
+        if user is None:
+            user = getattr(self.auth, 'user', {}) or {}
         uid   = user.get('localId')
         token = user.get('idToken')
+
+        # 先写本地；上传成功之前它都是未同步的
+        self.write_local(slot, game_state, header, uid, synced=False)
+
+        # 再写云端
         if not uid or not token:
             print("⚠️ 未登录，跳过云端存档")
             return
 
+        hashes = {name: hash(json.dumps(value, sort_keys=True)) for name, value in shards.items()}
+        last = self.uploaded.get((uid, slot))
         try:
-            db.child("users")\
-              .child(uid)\
-              .child("saves")\
-              .child(f"slot_{slot}")\
-              .set(game_state, token)
+            if last is None:
+                # 本次运行第一次写这个槽：整槽覆盖，顺便清掉旧的整块格式
+                cloud.put(node(uid, "saves", f"slot_{slot}"), nest(shards), token)
+            else:
+                changed = {name: shards[name] for name in shards if last.get(name) != hashes[name]}
+                if changed:
+                    cloud.patch(node(uid, "saves", f"slot_{slot}"), changed, token)
+            # 头最后写：别的设备看到新版本号时，存档已经在云端
+            cloud.put(node(uid, "meta", f"slot_{slot}"), header, token)
+            self.uploaded[(uid, slot)] = hashes
+            self.mark_synced(slot, header, uid)
             print(f"✅ 云端 slot_{slot} 上传成功")
         except Exception as e:
+            self.uploaded.pop((uid, slot), None)
             print("❌ 云端存档失败：", e)
 
     def load_game(self, slot):
         """
-        先尝试本地读取 save_{slot+1}.json，
-        如果不存在，再尝试云端读取 slot_{slot}
+        先读本地 save_{slot+1}.json 及其版本号，再取云端 meta/slot_{slot}：
+        本地版本不比云端旧（或云端没有存档、网络失败）用本地；
+        云端更新时才并行下载分片，返回玩家附近已经就绪的部分存档，其余土壤块由 poll_load() 继续交付
         返回 dict 或 None
         """
-        import json
-
-        # 本地
-        filename = f'save_{slot+1}.json'
-        try:
-            with open(filename, 'r') as f:
-                data = json.load(f)
-            print(f"💾 本地存档 {filename} 读取成功")
-            return data
-        except FileNotFoundError:
-            print(f"⚠️ 本地 {filename} 不存在")
-
-        # 云端
+        self.loading = None
         user = getattr(self.auth, 'user', {}) or {}
         uid   = user.get('localId')
         token = user.get('idToken')
+
+        data, meta = self.read_local(slot, uid)
+        local_revision = meta.get('revision')
+        if data is None:
+            print(f"⚠️ 本地 save_{slot+1}.json 不存在")
+
         if not uid or not token:
             print("⚠️ 未登录，无法读取云端存档")
-            return None
+            return data
 
         try:
-            snapshot = db.child("users")\
-                         .child(uid)\
-                         .child("saves")\
-                         .child(f"slot_{slot}")\
-                         .get(token)
-            data = snapshot.val()
-            if data is None:
-                print(f"⚠️ 云端无存档 slot_{slot}")
-            else:
-                print(f"✅ 云端存档 slot_{slot} 读取成功")
+            header = cloud.get(node(uid, "meta", f"slot_{slot}"), token)
+        except Exception as e:
+            print("❌ 云端读取失败：", e)
             return data
+
+        if header is not None:
+            header = dict(header)
+            cloud_revision = header.get('revision') or 0
+            if data is not None and local_revision is not None and local_revision >= cloud_revision:
+                # 版本号是存档时刻的毫秒数：本地更新说明离线存过档或上传失败，下次存档会补传
+                if local_revision == cloud_revision:
+                    print(f"💾 本地存档与云端 slot_{slot} 版本一致")
+                else:
+                    print(f"💾 本地存档比云端 slot_{slot} 新（未同步），沿用本地")
+                return data
+        elif data is not None:
+            # 旧存档没有头，无法比较版本，沿用本地
+            return data
+
+        if header is not None and header.get('layout') == 'sharded':
+            load = ShardedLoad(uid, token, slot, header)
+            state = load.initial()
+            if state is None:
+                return data
+            self.uploaded.pop((uid, slot), None)
+            self.loading = load
+            return state
+
+        # 旧的整块格式
+        try:
+            payload = cloud.get(node(uid, "saves", f"slot_{slot}"), token)
         except Exception as e:
             print("❌ 云端读取失败：", e)
+            return data
+        if payload is None:
+            print(f"⚠️ 云端无存档 slot_{slot}")
+            return data
+
+        print(f"✅ 云端存档 slot_{slot} 读取成功")
+        soil = payload.get('soil') if isinstance(payload, dict) else None
+        if isinstance(soil, dict) and soil.get('grid') is not None:
+            soil['grid'] = dense_grid(soil['grid'])
+        if header is not None:
+            self.write_local(slot, payload, header, uid, synced=True)
+        return payload
+
+    def poll_load(self):
+        """
+        每帧调用：返回新到达的土壤块 {'chunks', 'plants'}（交给 SoilLayer.load_state_dict），没有则 None
+        全部到齐后写本地缓存并结束加载
+        """
+        load = self.loading
+        if load is None:
             return None
+        soil = load.poll()
+        if load.done and load.failed:
+            # 缺块的存档不能写成本地缓存；那些块保留读档前的格子，下次存档整槽重传
+            self.loading = None
+            print(f"⚠️ slot_{load.slot} 有 {len(load.failed)} 个分片读取失败，保留这些块的现有土地")
+        elif load.done:
+            self.loading = None
+            print(f"☁️ slot_{load.slot} 全部分片到齐：{(time.perf_counter() - load.started) * 1000:.0f} ms")
+            # 本地缓存也交给存档线程，和同一槽位的存档依次写入
+            self.worker.submit(load.slot, load.full_state(),
+                               lambda slot, state: self.write_local(slot, state, load.header, load.uid, synced=True))
+        return soil
 
-    def auto_save_if_due(self, game_state, slot=0, interval=30):
+    def auto_save_if_due(self, get_state, slot=0, interval=30):
         """
-        每 interval 秒自动云端存档到槽 slot
+        每 interval 秒自动云端存档到槽 slot；get_state 只在到期时调用，上传在后台进行
+        加载期间请求过的存档也在这里补存
         """
+        self.flush_deferred(get_state)
         now = time.time()
-        if now - self.last_saved >= interval:
+        if now - self.last_saved >= interval and not self.loading:
             print("⏳ 自动云端存档…")
-            self.save_game(slot, game_state)
+            self.save_in_background(slot, get_state())
             self.last_saved = now
@@ -7,6 +7,8 @@ BUTTON_WIDTH = 80
 BUTTON_HEIGHT = 30
 MENU_OFFSET = 10
 UI_FONT_SIZE = 16
+UI_FONT = 'font/PixeloidSans.ttf'
+TEXT_CACHE_SIZE = 256
 
 UI_COLORS = {
     'brown_dark':  (75, 49, 38),    # 深棕色边框
@@ -46,6 +48,45 @@ APPLE_POS = {
 	'Large': [(30,24), (60,65), (50,50), (16,40),(45,50), (42,70)]
 }
 
+# audio: name -> (file, volume, max voices playing at once)
+SOUNDS = {
+	'success': ('audio/success.wav', 0.3, 2),
+	'axe': ('audio/axe.mp3', 1.0, 2),
+	'water': ('audio/water.mp3', 0.2, 1),
+	'hoe': ('audio/hoe.wav', 0.1, 2),
+	'plant': ('audio/plant.wav', 0.2, 2)
+}
+MUSIC = ('audio/music.mp3', 1.0)
+
+# rain splashes live in a fixed ring of slots; older splashes are overwritten
+RAIN_SPLASH_SLOTS = 48
+
+# quality presets, lowest first
+# presets only change effect work; the camera always shows SCREEN_WIDTH x SCREEN_HEIGHT world pixels
+# rain_density: drops and splashes spawned per frame
+# animation_fps: how often shared tile animations advance (0 = every frame)
+# lighting: day/night tint pass (the sleep fade is always drawn)
+QUALITY_PRESETS = [
+	{'name': 'low',    'rain_density': 0.5, 'animation_fps': 10, 'lighting': False},
+	{'name': 'medium', 'rain_density': 1,   'animation_fps': 20, 'lighting': True},
+	{'name': 'high',   'rain_density': 2,   'animation_fps': 0,  'lighting': True}
+]
+QUALITY_DEFAULT = 'high'
+QUALITY_ADAPTIVE = True
+
+# adaptive quality: frame budget and how long the average must stay off before switching
+FRAME_BUDGET_MS = 1000 / 60
+GOVERNOR_WINDOW = 90      # frames per decision (median, so single hitches don't count)
+GOVERNOR_DOWN = 0.9       # step down above this share of the budget
+GOVERNOR_UP = 0.5         # step up below this share of the budget
+GOVERNOR_COOLDOWN = 3     # windows to wait after a switch
+
+# world chunks (sizes in tiles, margins in chunks)
+CHUNK_SIZE = 16
+CHUNK_LOAD_MARGIN = 1
+CHUNK_EVICT_MARGIN = 2
+CHUNK_LOADS_PER_FRAME = 2
+
 GROW_SPEED = {
 	'corn': 1,
 	'tomato': 0.7
@@ -1,72 +1,141 @@
 import pygame 
 from settings import *
 from support import import_folder, resource_path
-from sprites import Generic
+from sprites import Entity, EntityGroup
+from timer import timers
 from random import randint, choice
 
 class Sky:
 	def __init__(self):
 		self.display_surface = pygame.display.get_surface()
-		self.full_surf = pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT))
-		self.start_color = [255,255,255]
 		self.end_color = (38,101,189)
+		self.lighting = True # False skips the day/night tint (quality presets)
 
-	def display(self, dt):
-		for index, value in enumerate(self.end_color):
-			if self.start_color[index] > value:
-				self.start_color[index] -= 2 * dt
+		# day/night tint as a lookup over time of day:
+		# every step darkens each channel by one until it reaches end_color
+		self.steps_per_second = 2
+		steps = 255 - min(self.end_color)
+		self.tint_lut = [
+			tuple(max(end, 255 - step) for end in self.end_color)
+			for step in range(steps + 1)]
+		self.reset()
 
-		self.full_surf.fill(self.start_color)
-		self.display_surface.blit(self.full_surf, (0,0), special_flags = pygame.BLEND_RGBA_MULT)
+	def reset(self):
+		self.time = 0
+		self.color = self.tint_lut[0]
+		self.tint = None
 
-class Drop(Generic):
-	def __init__(self, surf, pos, moving, groups, z):
+	@property
+	def start_color(self):
+		return list(self.color)
+
+	@start_color.setter
+	def start_color(self, color):
+		# red has the longest fade, so it tells how far into the day we are
+		step = min(max(int(255 - color[0]), 0), len(self.tint_lut) - 1)
+		self.time = step / self.steps_per_second
+		self.color = self.tint_lut[step]
+
+	def update(self, dt):
+		self.time += dt
+		step = min(int(self.time * self.steps_per_second), len(self.tint_lut) - 1)
+		self.color = self.tint_lut[step]
+
+	def display(self, dt, fade = 255):
+		"""
+		Lighting pass: the sky tint and the sleep transition fade are
+		combined and multiplied onto the screen at most once per frame
+		"""
+		self.update(dt)
+		color = self.color if self.lighting else (255,255,255)
+		if fade == 255:
+			tint = color
+		else:
+			tint = tuple(channel * fade // 255 for channel in color)
+
+		self.tint = None if tint == (255,255,255) else tint
+		if self.tint:
+			self.display_surface.fill(self.tint, special_flags = pygame.BLEND_RGB_MULT)
+
+class Drop(Entity):
+	__slots__ = ('pos', 'direction', 'speed')
+
+	def __init__(self, surf, pos, groups, z):
 		
 		# general setup
 		super().__init__(pos, surf, groups, z)
-		self.lifetime = randint(400,500)
-		self.start_time = pygame.time.get_ticks()
+		timers.schedule(randint(400,500), self.kill)
 
 		# moving 
-		self.moving = moving
-		if self.moving:
-			self.pos = pygame.math.Vector2(self.rect.topleft)
-			self.direction = pygame.math.Vector2(-2,4)
-			self.speed = randint(200,250)
+		self.pos = pygame.math.Vector2(self.rect.topleft)
+		self.direction = pygame.math.Vector2(-2,4)
+		self.speed = randint(200,250)
 
 	def update(self,dt):
 		# movement
-		if self.moving:
-			self.pos += self.direction * self.speed * dt
-			self.rect.topleft = (round(self.pos.x), round(self.pos.y))
+		self.pos += self.direction * self.speed * dt
+		self.rect.topleft = (round(self.pos.x), round(self.pos.y))
 
-		# timer
-		if pygame.time.get_ticks() - self.start_time >= self.lifetime:
-			self.kill()
+class Splashes:
+	"""
+	Ground splashes as a fixed ring of slots instead of sprites.
+	Nothing is sorted or updated per splash: the camera asks for the live ones
+	and blits them in one run at LAYERS['rain floor']
+	"""
+	def __init__(self, surfs, slots = RAIN_SPLASH_SLOTS):
+		self.surfs = surfs
+		self.slots = [[None, 0, 0, 0] for _ in range(slots)] # image, x, y, expiry (ms)
+		self.head = 0
+		self.expiry = 0 # latest expiry in the ring, nothing to draw after it
+		self.z = LAYERS['rain floor']
+
+	def stamp(self, pos):
+		expiry = pygame.time.get_ticks() + randint(400,500)
+		self.slots[self.head][:] = choice(self.surfs), pos[0], pos[1], expiry
+		self.head = (self.head + 1) % len(self.slots)
+		self.expiry = max(self.expiry, expiry)
+
+	def entries(self, ox, oy):
+		"""(image, screen position) of every live splash for a camera offset"""
+		now = pygame.time.get_ticks()
+		if now >= self.expiry:
+			return ()
+		return [(image, (x - ox, y - oy)) for image, x, y, expiry in self.slots if expiry > now]
 
 class Rain:
 	def __init__(self, all_sprites):
 		self.all_sprites = all_sprites
+		self.drops = EntityGroup()
 		self.rain_drops = import_folder(resource_path('images/rain/drops/'))
-		self.rain_floor = import_folder(resource_path('images/rain/floor/'))
-		self.floor_w, self.floor_h = pygame.image.load(resource_path('images/world/ground.png')).get_size()
+		self.splashes = Splashes(import_folder(resource_path('images/rain/floor/')))
+		self.floor_w, self.floor_h = all_sprites.ground.bounds.size
+
+		# spawns per frame, alternating splash and falling drop
+		self.density = 2
+		self.spawn = 0
+		self.next_floor = True
 
 	def create_floor(self):
-		Drop(
-			surf = choice(self.rain_floor), 
-			pos = (randint(0,self.floor_w),randint(0,self.floor_h)), 
-			moving = False, 
-			groups = self.all_sprites, 
-			z = LAYERS['rain floor'])
+		self.splashes.stamp((randint(0,self.floor_w),randint(0,self.floor_h)))
 
 	def create_drops(self):
 		Drop(
 			surf = choice(self.rain_drops), 
 			pos = (randint(0,self.floor_w),randint(0,self.floor_h)), 
-			moving = True, 
-			groups = self.all_sprites, 
+			groups = [self.all_sprites.entities, self.drops], 
 			z = LAYERS['rain drops'])
 
 	def update(self):
-		self.create_floor()
-		self.create_drops()
+		self.spawn += self.density
+		while self.spawn >= 1:
+			self.spawn -= 1
+			if self.next_floor:
+				self.create_floor()
+			else:
+				self.create_drops()
+			self.next_floor = not self.next_floor
+
+	def update_drops(self, dt):
+		# drops are entities, so only the rain's own group is updated
+		for drop in self.drops:
+			drop.update(dt)
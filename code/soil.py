@@ -1,30 +1,39 @@
 import pygame
 from random import choice
 from support import import_folder, import_folder_dict, resource_path
+from sprites import Entity
+from audio import audio
 
 from settings import *
 
-class SoilTile(pygame.sprite.Sprite):
+# 同种作物的帧只加载一次，闪光剪影缓存也因此能在作物之间共用
+_plant_frames = {}
+
+def plant_frames(plant_type):
+    frames = _plant_frames.get(plant_type)
+    if frames is None:
+        frames = _plant_frames[plant_type] = import_folder(resource_path(f'images/fruit/{plant_type}'))
+    return frames
+
+class SoilTile(Entity):
+    __slots__ = ()
+
     def __init__(self, pos, surf, groups):
-        super().__init__(groups)
-        self.image = surf
-        self.rect = self.image.get_rect(topleft=pos)
-        self.z = LAYERS['soil']
+        super().__init__(pos, surf, groups, LAYERS['soil'])
+
+class WaterTile(Entity):
+    __slots__ = ()
 
-class WaterTile(pygame.sprite.Sprite):
     def __init__(self, pos, surf, groups):
-        super().__init__(groups)
-        self.image = surf
-        self.rect = self.image.get_rect(topleft=pos)
-        self.z = LAYERS['soil water']
+        super().__init__(pos, surf, groups, LAYERS['soil water'])
 
 class Plant(pygame.sprite.Sprite):
-    def __init__(self, plant_type, groups, soil, check_watered):
+    def __init__(self, plant_type, groups, cell):
         super().__init__(groups)
         self.plant_type = plant_type
-        self.frames = import_folder(resource_path(f'images/fruit/{plant_type}'))
-        self.soil = soil
-        self.check_watered = check_watered
+        self.frames = plant_frames(plant_type)
+        self.cell = cell
+        self.soil_rect = pygame.Rect(cell[0]*TILE_SIZE, cell[1]*TILE_SIZE, TILE_SIZE, TILE_SIZE)
 
         self.age = 0
         self.max_age = len(self.frames) - 1
@@ -34,32 +43,90 @@ class Plant(pygame.sprite.Sprite):
         self.image = self.frames[self.age]
         self.y_offset = -16 if plant_type == 'corn' else -8
         self.rect = self.image.get_rect(
-            midbottom=self.soil.rect.midbottom + pygame.math.Vector2(0, self.y_offset)
+            midbottom=self.soil_rect.midbottom + pygame.math.Vector2(0, self.y_offset)
         )
         self.z = LAYERS['ground plant']
 
-    def grow(self):
-        if self.check_watered(self.rect.center):
-            self.age += self.grow_speed
-            if int(self.age) > 0:
-                self.z = LAYERS['main']
-                self.hitbox = self.rect.copy().inflate(-26, -self.rect.height * 0.4)
-            if self.age >= self.max_age:
-                self.age = self.max_age
-                self.harvestable = True
+    def set_age(self, age):
+        stage = int(self.age)
+        self.age = min(age, self.max_age)
+        self.harvestable = self.age >= self.max_age
+        # 只有换了阶段才需要换图；读档对账时阶段也可能变小
+        if int(self.age) != stage:
             self.image = self.frames[int(self.age)]
             self.rect = self.image.get_rect(
-                midbottom=self.soil.rect.midbottom + pygame.math.Vector2(0, self.y_offset)
+                midbottom=self.soil_rect.midbottom + pygame.math.Vector2(0, self.y_offset)
             )
+            if int(self.age) > 0:
+                self.z = LAYERS['main']
+                self.hitbox = self.rect.copy().inflate(-26, -self.rect.height * 0.4)
+            else:
+                # 幼苗贴地绘制，也不挡路
+                self.z = LAYERS['ground plant']
+                if hasattr(self, 'hitbox'):
+                    del self.hitbox
+
+    def grow(self):
+        self.set_age(self.age + self.grow_speed)
+
+class GrowthScheduler:
+    """
+    按格子索引作物：新的一天只推进浇过水且未成熟的作物，
+    成熟作物同时登记到世界索引（'ripe plant'），收获时只查询玩家附近
+    """
+    def __init__(self, world):
+        self.world = world
+        self.growing = {}  # (x, y) -> Plant
+        self.ripe = {}     # (x, y) -> Plant
+
+    def add(self, plant):
+        if plant.harvestable:
+            self.ripe[plant.cell] = plant
+            self.world.insert(plant, 'ripe plant')
+        else:
+            self.growing[plant.cell] = plant
+
+    def remove(self, plant):
+        self.growing.pop(plant.cell, None)
+        if self.ripe.pop(plant.cell, None):
+            self.world.remove(plant)
+
+    def plant_at(self, cell):
+        return self.growing.get(cell) or self.ripe.get(cell)
+
+    def clear(self):
+        self.growing.clear()
+        self.ripe.clear()
+        self.world.clear('ripe plant')
+
+    def advance_day(self, watered):
+        """watered: 当天浇过水的格子集合"""
+        cells = [cell for cell in watered if cell in self.growing]
+        for cell in cells:
+            plant = self.growing[cell]
+            plant.grow()
+            if plant.harvestable:
+                del self.growing[cell]
+                self.add(plant)
 
 class SoilLayer:
     def __init__(self, all_sprites, collision_sprites, level):
         self.level = level
         self.all_sprites = all_sprites
         self.collision_sprites = collision_sprites
-        self.soil_sprites = pygame.sprite.Group()
-        self.water_sprites = pygame.sprite.Group()
+        self.soil_tiles = {}   # (x, y) -> SoilTile
+        self.water_tiles = {}  # (x, y) -> WaterTile
         self.plant_sprites = pygame.sprite.Group()
+        self.growth = GrowthScheduler(level.world)
+        self.watered = set()
+
+        # 世界按块加载时由 ChunkManager 替换：未加载的格子只保留 grid 状态，不创建实体
+        self.is_loaded = lambda x, y: True
+
+        # 存档快照：每行冻结后的元组按行缓存，revision 变化才重建快照
+        self.row_cache = {}
+        self.revision = 0
+        self.snapshot = None
 
         self.soil_surfs = import_folder_dict(resource_path('images/soil/'))
         self.water_surfs = import_folder(resource_path('images/soil_water'))
@@ -67,17 +134,24 @@ class SoilLayer:
         self.create_soil_grid()
         self.create_hit_rects()
 
-        self.hoe_sound = pygame.mixer.Sound(resource_path('audio/hoe.wav'))
-        self.hoe_sound.set_volume(0.1)
-
-        self.plant_sound = pygame.mixer.Sound(resource_path('audio/plant.wav'))
-        self.plant_sound.set_volume(0.2)
-
     def create_soil_grid(self):
         farmable = self.level.tmx_data.get_layer_by_name('Farmable')
         self.grid = [[[] for _ in range(farmable.width)] for _ in range(farmable.height)]
         for x, y, _ in farmable.tiles():
             self.grid[y][x].append('F')
+        self.touch()
+
+    def cell_at(self, x, y):
+        """grid[y][x]；越界或云端存档中缺失的格子返回 None"""
+        return self.cell_in(self.grid, x, y)
+
+    @staticmethod
+    def cell_in(grid, x, y):
+        if 0 <= y < len(grid) and isinstance(grid[y], list) and 0 <= x < len(grid[y]):
+            cell = grid[y][x]
+            if isinstance(cell, list):
+                return cell
+        return None
 
     def create_hit_rects(self):
         self.hit_rects = []
@@ -91,25 +165,31 @@ class SoilLayer:
     def get_hit(self, point):
         for rect in self.hit_rects:
             if rect.collidepoint(point):
-                self.hoe_sound.play()
+                audio.play('hoe')
                 x, y = rect.x // TILE_SIZE, rect.y // TILE_SIZE
                 cell = self.grid[y][x]
                 if 'F' in cell and 'X' not in cell:
                     cell.append('X')
+                    self.touch(y)
                     self.create_soil_tiles()
                     self.create_hit_rects()
                     if self.level.raining:
                         self.water_all()
 
+    def create_water_tile(self, x, y):
+        self.water_tiles[(x, y)] = WaterTile((x*TILE_SIZE, y*TILE_SIZE),
+                                             choice(self.water_surfs),
+                                             [self.all_sprites.entities])
+
     def water(self, target_pos):
-        for soil in self.soil_sprites.sprites():
-            if soil.rect.collidepoint(target_pos):
-                x, y = soil.rect.x // TILE_SIZE, soil.rect.y // TILE_SIZE
-                cell = self.grid[y][x]
-                if 'W' not in cell:
-                    cell.append('W')
-                    WaterTile(soil.rect.topleft, choice(self.water_surfs),
-                              [self.all_sprites, self.water_sprites])
+        x, y = int(target_pos[0]) // TILE_SIZE, int(target_pos[1]) // TILE_SIZE
+        if (x, y) in self.soil_tiles:
+            cell = self.grid[y][x]
+            if 'W' not in cell:
+                cell.append('W')
+                self.touch(y)
+                self.watered.add((x, y))
+                self.create_water_tile(x, y)
 
     def water_all(self):
         for ry, row in enumerate(self.grid):
@@ -118,133 +198,271 @@ class SoilLayer:
             for rx, cell in enumerate(row):
                 if isinstance(cell, list) and 'X' in cell and 'W' not in cell:
                     cell.append('W')
-                    WaterTile((rx*TILE_SIZE, ry*TILE_SIZE),
-                              choice(self.water_surfs),
-                              [self.all_sprites, self.water_sprites])
+                    self.touch(ry)
+                    self.watered.add((rx, ry))
+                    if self.is_loaded(rx, ry):
+                        self.create_water_tile(rx, ry)
 
     def remove_water(self):
-        for w in self.water_sprites.sprites():
+        for w in self.water_tiles.values():
             w.kill()
+        self.water_tiles.clear()
+        self.watered.clear()
         for ry, row in enumerate(self.grid):
             if not isinstance(row, list):
                 continue
             for cell in row:
                 if isinstance(cell, list) and 'W' in cell:
                     cell.remove('W')
+                    self.touch(ry)
 
-    def check_watered(self, pos):
-        x, y = pos[0] // TILE_SIZE, pos[1] // TILE_SIZE
-        cell = self.grid[y][x]
-        return isinstance(cell, list) and 'W' in cell
+    def add_plant(self, cell, seed):
+        x, y = cell
+        self.grid[y][x].append('P')
+        self.touch(y)
+        plant = Plant(seed, [self.all_sprites, self.plant_sprites, self.collision_sprites], cell)
+        if not self.is_loaded(x, y):
+            plant.remove(self.all_sprites, self.collision_sprites)
+        self.growth.add(plant)
+        return plant
 
     def plant_seed(self, target_pos, seed):
-        for soil in self.soil_sprites.sprites():
-            if soil.rect.collidepoint(target_pos):
-                x, y = soil.rect.x // TILE_SIZE, soil.rect.y // TILE_SIZE
-                cell = self.grid[y][x]
-                if 'P' not in cell:
-                    self.plant_sound.play()
-                    cell.append('P')
-                    Plant(seed, [self.all_sprites, self.plant_sprites, self.collision_sprites],
-                          soil, self.check_watered)
+        x, y = int(target_pos[0]) // TILE_SIZE, int(target_pos[1]) // TILE_SIZE
+        if (x, y) in self.soil_tiles and 'P' not in self.grid[y][x]:
+            audio.play('plant')
+            return self.add_plant((x, y), seed)
 
     def update_plants(self):
-        for p in self.plant_sprites.sprites():
-            p.grow()
+        self.growth.advance_day(self.watered)
+        self.revision += 1  # 作物年龄变了，grid 不变
+
+    def harvest(self, plant):
+        self.growth.remove(plant)
+        plant.kill()
+        x, y = plant.cell
+        self.grid[y][x].remove('P')
+        self.touch(y)
+
+    def merge_chunks(self, chunks, plants):
+        """
+        云端分片读档：{(cx, cy): 子网格} 只替换这些土壤块，其余格子和作物保持现状；
+        返回可交给 load_state_dict 对账的完整 {'grid', 'plants'}
+        子网格已由 save_system.dense_grid 还原成列表，空列表 / None 表示云端的空块；下载失败的块不会出现在 chunks 里
+        """
+        grid = [list(row) if isinstance(row, list) else row for row in self.grid]
+        for (cx, cy), sub in chunks.items():
+            sub = sub if isinstance(sub, list) else []
+            for dy in range(CHUNK_SIZE):
+                y = cy * CHUNK_SIZE + dy
+                if not (0 <= y < len(grid)) or not isinstance(grid[y], list):
+                    continue
+                # 云端会丢掉空列表，缺失的行/格子就是空格子
+                row = sub[dy] if dy < len(sub) and isinstance(sub[dy], list) else []
+                for dx in range(CHUNK_SIZE):
+                    x = cx * CHUNK_SIZE + dx
+                    if x >= len(grid[y]):
+                        break
+                    cell = row[dx] if dx < len(row) else None
+                    grid[y][x] = list(cell) if isinstance(cell, list) else []
+
+        def arrived(x, y):
+            return (x // CHUNK_SIZE, y // CHUNK_SIZE) in chunks
+        kept = [p for p in self.get_state_dict()['plants'] if not arrived(p['x'], p['y'])]
+        kept += [p for p in plants if arrived(p['x'], p['y'])]
+        return {'grid': grid, 'plants': kept}
+
+    def touch(self, y = None):
+        """grid 第 y 行（None 为整张表）被改动：下一次快照只重新冻结这些行"""
+        self.revision += 1
+        if y is None:
+            self.row_cache.clear()
+        else:
+            self.row_cache.pop(y, None)
+
+    def freeze_row(self, y):
+        row = self.grid[y]
+        if isinstance(row, list):
+            row = tuple(tuple(cell) if isinstance(cell, list) else cell for cell in row)
+        self.row_cache[y] = row
+        return row
+
+    def soil_tile_name(self, rx, ry):
+        # 检查上下左右是否也是已开垦的土壤
+        t = 'X' in (self.cell_at(rx, ry-1) or ())
+        b = 'X' in (self.cell_at(rx, ry+1) or ())
+        l = 'X' in (self.cell_at(rx-1, ry) or ())
+        r = 'X' in (self.cell_at(rx+1, ry) or ())
+
+        # 你的原 tile 选择逻辑
+        tile = 'o'
+        if all((t, r, b, l)): tile = 'soil'
+        elif t and b and l: tile = 'soil'
+        elif t and b and r: tile = 'soil'
+        elif l and r and t: tile = 'soil'
+        elif l and r and b: tile = 'soil'
+        elif t and b: tile = 'soil'
+        elif l and r: tile = 'soil'
+        elif b and r: tile = 'soil'
+        elif b and l: tile = 'soil'
+        elif t and r: tile = 'soil'
+        elif t and l: tile = 'soil'
+        elif t: tile = 'soil'
+        elif b: tile = 'soil'
+        elif l: tile = 'soil'
+        elif r: tile = 'soil'
+        return tile
+
+    def create_soil_tile(self, x, y):
+        self.soil_tiles[(x, y)] = SoilTile((x*TILE_SIZE, y*TILE_SIZE),
+                                           self.soil_surfs[self.soil_tile_name(x, y)],
+                                           [self.all_sprites.entities])
 
     def create_soil_tiles(self):
-        # 清除旧 soil 精灵
-        for spr in list(self.soil_sprites.sprites()):
+        # 清除旧 soil 实体
+        for spr in self.soil_tiles.values():
             spr.kill()
+        self.soil_tiles.clear()
 
         for ry, row in enumerate(self.grid):
             if not isinstance(row, list):
                 continue
             for rx, cell in enumerate(row):
-                if not isinstance(cell, list):
-                    continue
-                if 'F' in cell and 'X' in cell:
-                    # 安全检查上下左右是否为列表，避免 KeyError
-                    t = False
-                    if ry > 0 and isinstance(self.grid[ry-1], list) and rx < len(self.grid[ry-1]):
-                        above = self.grid[ry-1][rx]
-                        t = isinstance(above, list) and 'X' in above
-                    b = False
-                    if ry < len(self.grid)-1 and isinstance(self.grid[ry+1], list) and rx < len(self.grid[ry+1]):
-                        below = self.grid[ry+1][rx]
-                        b = isinstance(below, list) and 'X' in below
-                    l = False
-                    if rx > 0 and isinstance(row[rx-1], list):
-                        l = 'X' in row[rx-1]
-                    r = False
-                    if rx < len(row)-1 and isinstance(row[rx+1], list):
-                        r = 'X' in row[rx+1]
-
-                    # 你的原 tile 选择逻辑
-                    tile = 'o'
-                    if all((t, r, b, l)): tile = 'soil'
-                    elif t and b and l: tile = 'soil'
-                    elif t and b and r: tile = 'soil'
-                    elif l and r and t: tile = 'soil'
-                    elif l and r and b: tile = 'soil'
-                    elif t and b: tile = 'soil'
-                    elif l and r: tile = 'soil'
-                    elif b and r: tile = 'soil'
-                    elif b and l: tile = 'soil'
-                    elif t and r: tile = 'soil'
-                    elif t and l: tile = 'soil'
-                    elif t: tile = 'soil'
-                    elif b: tile = 'soil'
-                    elif l: tile = 'soil'
-                    elif r: tile = 'soil'
-
-                    SoilTile((rx*TILE_SIZE, ry*TILE_SIZE),
-                             self.soil_surfs[tile],
-                             [self.all_sprites, self.soil_sprites])
+                if isinstance(cell, list) and 'F' in cell and 'X' in cell and self.is_loaded(rx, ry):
+                    self.create_soil_tile(rx, ry)
 
-    def get_state_dict(self):
-        plants = []
-        for p in self.plant_sprites:
-            cx = p.soil.rect.x // TILE_SIZE
-            cy = p.soil.rect.y // TILE_SIZE
-            plants.append({'x':cx, 'y':cy, 'type':p.plant_type, 'age':p.age})
-        return {'grid': self.grid, 'plants': plants}
+    def load_cells(self, cells):
+        """世界块加载：为这些格子创建土壤/水面实体，并把作物放回绘制与碰撞组"""
+        for x, y in cells:
+            cell = self.cell_at(x, y)
+            if cell is None:
+                continue
+            if 'F' in cell and 'X' in cell:
+                self.create_soil_tile(x, y)
+            if 'W' in cell:
+                self.create_water_tile(x, y)
+            plant = self.growth.plant_at((x, y))
+            if plant:
+                plant.add(self.all_sprites, self.collision_sprites)
 
-    def load_state_dict(self, data):
-        import copy
-        raw = data.get('grid')
-        if isinstance(raw, list):
-            self.grid = copy.deepcopy(raw)
+    def evict_cells(self, cells):
+        """世界块驱逐：只销毁实体，grid 与作物对象保留"""
+        for cell in cells:
+            tile = self.soil_tiles.pop(cell, None)
+            if tile:
+                tile.kill()
+            tile = self.water_tiles.pop(cell, None)
+            if tile:
+                tile.kill()
+            plant = self.growth.plant_at(cell)
+            if plant:
+                plant.remove(self.all_sprites, self.collision_sprites)
+
+    def get_state_dict(self):
+        """
+        不可变快照：grid 由冻结的行元组组成，未改动的行在前后快照之间共享，
+        没有改动时直接返回上一次的快照。后台线程可以放心序列化，调用方不要修改返回值
+        """
+        if self.snapshot and self.snapshot[0] == self.revision:
+            return self.snapshot[1]
 
-        # 杀掉所有旧精灵
-        for spr in list(self.soil_sprites.sprites()): spr.kill()
-        for spr in list(self.water_sprites.sprites()): spr.kill()
-        for spr in list(self.plant_sprites.sprites()): spr.kill()
+        rows = self.row_cache
+        grid = tuple(rows[y] if y in rows else self.freeze_row(y) for y in range(len(self.grid)))
+        plants = tuple({'x':p.cell[0], 'y':p.cell[1], 'type':p.plant_type, 'age':p.age}
+                       for p in self.plant_sprites)
+        state = {'grid': grid, 'plants': plants}
+        self.snapshot = (self.revision, state)
+        return state
 
-        # 重建场景
-        self.create_soil_tiles()
-        self.create_hit_rects()
+    def load_state_dict(self, data):
+        """
+        与当前世界对比后只改动不同的部分：X/W 变化的格子重建土壤/水面实体（土壤连同四邻），
+        类型相同的作物原地改年龄，其余作物删除或新建（读档不播放种植音效）
+        """
+        if 'chunks' in data:
+            data = self.merge_chunks(data['chunks'], data.get('plants') or [])
 
-        # 恢复水面
-        for ry, row in enumerate(self.grid):
-            if not isinstance(row, list): continue
-            for rx, cell in enumerate(row):
-                if isinstance(cell, list) and 'W' in cell:
-                    WaterTile((rx*TILE_SIZE, ry*TILE_SIZE),
-                              choice(self.water_surfs),
-                              [self.all_sprites, self.water_sprites])
+        raw = data.get('grid')
+        if isinstance(raw, (list, tuple)):
+            # 存档（列表）和内存快照（元组）都复制成可修改的列表
+            grid = [[list(cell) if isinstance(cell, (list, tuple)) else cell for cell in row]
+                    if isinstance(row, (list, tuple)) else row
+                    for row in raw]
+        else:
+            grid = self.grid
 
-        for row in self.grid:
+        # 作物标记由下面的作物对账重新写入
+        for row in grid:
             if not isinstance(row, list): continue
             for cell in row:
                 if isinstance(cell, list) and 'P' in cell:
                     cell.remove('P')
-                    
-        # 恢复植物
+
+        # 找出 X / W / F 有变化的格子
+        self.grid, old_grid = grid, self.grid
+        height = max(len(grid), len(old_grid))
+        width = max([len(row) for row in grid + old_grid if isinstance(row, list)] or [0])
+        changed = []
+        hit_changed = False
+        for y in range(height):
+            for x in range(width):
+                before = self.cell_in(old_grid, x, y) or ()
+                after = self.cell_at(x, y) or ()
+                if ('X' in before) != ('X' in after) or ('W' in before) != ('W' in after):
+                    changed.append((x, y, ('X' in before) != ('X' in after)))
+                if ('F' in before) != ('F' in after):
+                    hit_changed = True
+
+        refresh = set()
+        for x, y, soil_changed in changed:
+            cell = self.cell_at(x, y) or ()
+            if 'W' in cell:
+                self.watered.add((x, y))
+                if (x, y) not in self.water_tiles and self.is_loaded(x, y):
+                    self.create_water_tile(x, y)
+            else:
+                self.watered.discard((x, y))
+                tile = self.water_tiles.pop((x, y), None)
+                if tile:
+                    tile.kill()
+            if soil_changed:
+                refresh.update(((x, y), (x, y-1), (x, y+1), (x-1, y), (x+1, y)))
+
+        # 土壤贴图取决于四邻，所以变化格子的邻居也一起重建
+        for x, y in refresh:
+            tile = self.soil_tiles.pop((x, y), None)
+            if tile:
+                tile.kill()
+            cell = self.cell_at(x, y)
+            if cell is not None and 'F' in cell and 'X' in cell and self.is_loaded(x, y):
+                self.create_soil_tile(x, y)
+        if hit_changed:
+            self.create_hit_rects()
+
+        # 作物对账
+        wanted = {}
         for pd in data.get('plants', []):
-            cx = pd['x']*TILE_SIZE + TILE_SIZE//2
-            cy = pd['y']*TILE_SIZE + TILE_SIZE//2
-            self.plant_seed((cx, cy), pd['type'])
-            plant = self.plant_sprites.sprites()[-1]
-            plant.age = pd['age']
-            plant.image = plant.frames[int(plant.age)]
+            cell = self.cell_at(pd['x'], pd['y'])
+            if cell is not None and 'X' in cell:
+                wanted.setdefault((pd['x'], pd['y']), pd)
+
+        for plant in self.plant_sprites.sprites():
+            pd = wanted.get(plant.cell)
+            if pd and pd['type'] == plant.plant_type:
+                del wanted[plant.cell]
+                x, y = plant.cell
+                self.grid[y][x].append('P')
+                if plant.age != pd['age']:
+                    self.growth.remove(plant)
+                    plant.set_age(pd['age'])
+                    self.growth.add(plant)
+            else:
+                self.growth.remove(plant)
+                plant.kill()
+
+        for cell, pd in wanted.items():
+            plant = self.add_plant(cell, pd['type'])
+            self.growth.remove(plant)
+            plant.set_age(pd['age'])
+            self.growth.add(plant)
+
+        self.touch()
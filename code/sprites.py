@@ -1,8 +1,9 @@
 import pygame
 from settings import *
 from random import randint, choice
-from support import resource_path
-from timer import Timer
+from support import resource_path, silhouette, import_image
+from timer import timers
+from audio import audio
 
 class Generic(pygame.sprite.Sprite):
 	def __init__(self, pos, surf, groups, z = LAYERS['main']):
@@ -12,34 +13,94 @@ class Generic(pygame.sprite.Sprite):
 		self.z = z
 		self.hitbox = self.rect.copy().inflate(-self.rect.width * 0.2, -self.rect.height * 0.75)
 
+class EntityGroup:
+	"""Ordered set of entities, the lightweight counterpart of a sprite group"""
+	def __init__(self):
+		self.entities = {}
+
+	def add(self, entity):
+		self.entities[entity] = None
+
+	def remove(self, entity):
+		self.entities.pop(entity, None)
+
+	def sprites(self):
+		return list(self.entities)
+
+	def __iter__(self):
+		return iter(list(self.entities))
+
+	def __len__(self):
+		return len(self.entities)
+
+	def __contains__(self, entity):
+		return entity in self.entities
+
+class Entity:
+	"""
+	High-count, behaviour-light world object (tiles, apples, rain).
+	Only image, rect and layer are stored, in __slots__ instead of a sprite's __dict__
+	"""
+	__slots__ = ('image', 'rect', 'z', 'groups')
+
+	def __init__(self, pos, surf, groups, z = LAYERS['main']):
+		self.image = surf
+		self.rect = surf.get_rect(topleft = pos)
+		self.z = z
+		self.join(groups)
+
+	def join(self, groups):
+		self.groups = tuple(groups)
+		for group in self.groups:
+			group.add(self)
+
+	def kill(self):
+		for group in self.groups:
+			group.remove(self)
+		self.groups = ()
+
+class Ground(Entity):
+	"""
+	World-sized backdrop. Each frame the camera narrows it to the visible area,
+	so only pixels on screen are blitted (the subsurface shares the full image's pixels)
+	"""
+	__slots__ = ('surf', 'bounds')
+
+	def __init__(self, surf, groups, z = LAYERS['ground']):
+		super().__init__((0,0), surf, groups, z)
+		self.surf = surf
+		self.bounds = surf.get_rect()
+
+	def view(self, viewport):
+		area = viewport.clip(self.bounds)
+		if area.width and area.height:
+			self.image = self.surf.subsurface(area)
+			self.rect = area
+		else:
+			# camera entirely off the map: blit a single pixel outside the screen
+			self.image = self.surf.subsurface((0, 0, 1, 1))
+			self.rect = pygame.Rect(viewport.left - 1, viewport.top - 1, 1, 1)
+
 class Interaction(Generic):
 	def __init__(self, pos, size, groups, name):
 		surf = pygame.Surface(size)
 		super().__init__(pos, surf, groups)
 		self.name = name
 
-class Water(Generic):
-	def __init__(self, pos, frames, groups):
+class Water(Entity):
+	__slots__ = ('animation',)
 
-		#animation setup
-		self.frames = frames
-		self.frame_index = 0
+	def __init__(self, pos, animation, groups):
 
-		# sprite setup
-		super().__init__(
-				pos = pos, 
-				surf = self.frames[self.frame_index], 
-				groups = groups, 
-				z = LAYERS['water']) 
-
-	def animate(self,dt):
-		self.frame_index += 5 * dt
-		if self.frame_index >= len(self.frames):
-			self.frame_index = 0
-		self.image = self.frames[int(self.frame_index)]
+		# the frame comes from the shared animation, so water tiles need no update()
+		self.animation = animation
+		self.rect = self.image.get_rect(topleft = pos)
+		self.z = LAYERS['water']
+		self.join(groups)
 
-	def update(self,dt):
-		self.animate(dt)
+	@property
+	def image(self):
+		return self.animation.image
 
 class WildFlower(Generic):
 	def __init__(self, pos, surf, groups):
@@ -49,40 +110,32 @@ class WildFlower(Generic):
 class Particle(Generic):
 	def __init__(self, pos, surf, groups, z, duration = 200):
 		super().__init__(pos, surf, groups, z)
-		self.start_time = pygame.time.get_ticks()
-		self.duration = duration
+		timers.schedule(duration, self.kill)
 
-		# white surface 
-		mask_surf = pygame.mask.from_surface(self.image)
-		new_surf = mask_surf.to_surface()
-		new_surf.set_colorkey((0,0,0))
-		self.image = new_surf
-
-	def update(self,dt):
-		current_time = pygame.time.get_ticks()
-		if current_time - self.start_time > self.duration:
-			self.kill()
+		# white surface, shared by every particle of the same image
+		self.image = silhouette(surf)
 
 class Tree(Generic):
-	def __init__(self, pos, surf, groups, name, player_add):
+	def __init__(self, pos, surf, groups, name, player_add, tree_id = None):
 		super().__init__(pos, surf, groups)
+		self.tree_id = tree_id
+		self.sprite_groups = groups
+		self.tree_surf = surf
+		self.attached = True # False while its world chunk is evicted
 
 		# tree attributes
 		self.health = 5
 		self.alive = True
 		stump_path = resource_path(f'images/stumps/{"small" if name == "Small" else "large"}.png')
-		self.stump_surf = pygame.image.load(stump_path).convert_alpha()
+		self.stump_surf = import_image(stump_path)
 
 		# apples
-		self.apple_surf = pygame.image.load(resource_path('images/fruit/apple.png'))
+		self.apple_surf = import_image(resource_path('images/fruit/apple.png'))
 		self.apple_pos = APPLE_POS[name]
-		self.apple_sprites = pygame.sprite.Group()
+		self.apples = {} # APPLE_POS index -> apple entity
 		self.create_fruit()
 
 		self.player_add = player_add
-
-		# sounds
-		self.axe_sound = pygame.mixer.Sound(resource_path('audio/axe.mp3'))
     
 	def damage(self):
 		
@@ -90,18 +143,19 @@ class Tree(Generic):
 		self.health -= 1
 
 		# play sound
-		self.axe_sound.play()
+		audio.play('axe')
 
 		# remove an apple
-		if len(self.apple_sprites) > 0:
-			random_apple = choice(self.apple_sprites.sprites())
+		if self.apples:
+			slot = choice(list(self.apples))
+			random_apple = self.apples[slot]
 			Particle(
 				pos = random_apple.rect.topleft,
 				surf = random_apple.image, 
 				groups = self.groups()[0], 
 				z = LAYERS['fruit'])
 			self.player_add('apple')
-			random_apple.kill()
+			self.remove_apple(slot)
    
 		if self.health <= 0 and self.alive:
 			self.check_death()
@@ -109,24 +163,87 @@ class Tree(Generic):
 	def check_death(self):
 		if self.health <= 0 and self.alive:
 			Particle(self.rect.topleft, self.image, self.groups()[0], LAYERS['fruit'], 300)
-			self.image = self.stump_surf
-			self.rect = self.image.get_rect(midbottom = self.rect.midbottom)
-			self.hitbox = self.rect.copy().inflate(-10,-self.rect.height * 0.6)
-			self.alive = False
+			self.become_stump()
 			self.player_add('wood')
-			self.groups()[0].remove(self) 
+
+	def become_stump(self):
+		self.image = self.stump_surf
+		self.rect = self.image.get_rect(midbottom = self.rect.midbottom)
+		self.hitbox = self.rect.copy().inflate(-10,-self.rect.height * 0.6)
+		self.alive = False
+		self.sprite_groups[0].remove(self)
+
+	def restore(self, health, alive, apple_mask):
+		"""Bring the tree to a saved state in place"""
+		self.health = health
+		if alive and not self.alive:
+			self.image = self.tree_surf
+			self.rect = self.image.get_rect(midbottom = self.rect.midbottom)
+			self.hitbox = self.rect.copy().inflate(-self.rect.width * 0.2, -self.rect.height * 0.75)
+			self.alive = True
+			if self.attached:
+				self.add(*self.sprite_groups)
+		elif not alive and self.alive:
+			self.become_stump()
+		self.set_apples(apple_mask if alive else 0)
+
+	def attach(self):
+		"""Chunk loaded: put the tree (or its stump) and its apples back into the world"""
+		if self.attached:
+			return
+		self.attached = True
+		if self.alive:
+			self.add(*self.sprite_groups)
+		else:
+			self.add(self.sprite_groups[1])
+		for apple in self.apples.values():
+			apple.join([self.sprite_groups[0].entities])
+
+	def detach(self):
+		"""Chunk evicted: leave every group but keep health, stump and apple slots"""
+		if not self.attached:
+			return
+		self.attached = False
+		self.remove(*self.sprite_groups)
+		for apple in self.apples.values():
+			apple.kill()
 
 	def update(self,dt):
 		if self.alive:
 			self.check_death()
 
+	@property
+	def apple_mask(self):
+		"""Apples currently on the tree as a bitmask over APPLE_POS"""
+		mask = 0
+		for slot in self.apples:
+			mask |= 1 << slot
+		return mask
+
+	def set_apples(self, mask):
+		for slot in range(len(self.apple_pos)):
+			if mask & (1 << slot):
+				if slot not in self.apples:
+					self.add_apple(slot)
+			elif slot in self.apples:
+				self.remove_apple(slot)
+
+	def add_apple(self, slot):
+		pos = self.apple_pos[slot]
+		x = pos[0] + self.rect.left
+		y = pos[1] + self.rect.top
+		self.apples[slot] = Entity(
+			pos = (x,y), 
+			surf = self.apple_surf, 
+			groups = [self.sprite_groups[0].entities] if self.attached else [],
+			z = LAYERS['fruit'])
+
+	def remove_apple(self, slot):
+		self.apples.pop(slot).kill()
+
 	def create_fruit(self):
-		for pos in self.apple_pos:
+		mask = 0
+		for slot in range(len(self.apple_pos)):
 			if randint(0,10) < 2:
-				x = pos[0] + self.rect.left
-				y = pos[1] + self.rect.top
-				Generic(
-					pos = (x,y), 
-					surf = self.apple_surf, 
-					groups = [self.apple_sprites,self.groups()[0]],
-					z = LAYERS['fruit'])
+				mask |= 1 << slot
+		self.set_apples(mask)
@@ -1,7 +1,12 @@
 from os import walk
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
 import pygame
+import pytmx
+from pytmx.util_pygame import pygame_image_loader
 import sys
 import os
+from settings import UI_FONT, TEXT_CACHE_SIZE
 
 def resource_path(relative_path):
     """Get absolute path to resource, works for development and PyInstaller"""
@@ -33,3 +38,122 @@ def import_folder_dict(path):
 			surface_dict[image.split('.')[0]] = image_surf
 
 	return surface_dict
+
+
+# images shared by many sprites (stumps, apples), decoded once per path
+_images = {}
+
+def import_image(path):
+	surf = _images.get(path)
+	if surf is None:
+		surf = _images[path] = pygame.image.load(path).convert_alpha()
+	return surf
+
+
+class LazyTile:
+	"""Where a TMX tile image lives; decoded the first time the tile is used"""
+	def __init__(self, sheet, rect, flags):
+		self.sheet = sheet
+		self.rect = rect
+		self.flags = flags
+
+	def load(self):
+		if self.sheet['loader'] is None:
+			self.sheet['loader'] = pygame_image_loader(*self.sheet['args'], **self.sheet['kwargs'])
+		return self.sheet['loader'](self.rect, self.flags)
+
+def lazy_image_loader(filename, colorkey, **kwargs):
+	"""pytmx image loader that only records tile positions; the tileset sheet is read on first use"""
+	sheet = {'loader': None, 'args': (filename, colorkey), 'kwargs': kwargs}
+	def load_image(rect = None, flags = None):
+		return LazyTile(sheet, rect, flags)
+	return load_image
+
+class TileImages(list):
+	"""TiledMap.images that decodes each gid on first access and keeps it"""
+	def __getitem__(self, gid):
+		image = super().__getitem__(gid)
+		if isinstance(image, LazyTile):
+			image = image.load()
+			self[gid] = image
+		return image
+
+def load_tmx(path):
+	"""Parse the map without decoding tile images: only tiles in loaded chunks ever get decoded"""
+	tmx = pytmx.TiledMap(path, image_loader = lazy_image_loader)
+	tmx.images = TileImages(tmx.images)
+	return tmx
+
+
+def merge_tiles(cells, tile_size):
+	"""Merge grid cells into few axis-aligned rects: runs along each row, then identical runs stacked down"""
+	rows = {}
+	for x, y in cells:
+		rows.setdefault(y, []).append(x)
+
+	rects = []
+	open_runs = {} # (start, end) -> rect that may grow into the next row
+	for y in sorted(rows):
+		xs = sorted(rows[y])
+		runs = []
+		start = prev = xs[0]
+		for x in xs[1:]:
+			if x != prev + 1:
+				runs.append((start, prev + 1))
+				start = x
+			prev = x
+		runs.append((start, prev + 1))
+
+		next_runs = {}
+		for run in runs:
+			rect = open_runs.get(run)
+			if rect is not None and rect.bottom == y * tile_size:
+				rect.height += tile_size
+			else:
+				rect = pygame.Rect(run[0] * tile_size, y * tile_size, (run[1] - run[0]) * tile_size, tile_size)
+				rects.append(rect)
+			next_runs[run] = rect
+		open_runs = next_runs
+
+	return rects
+
+
+# shared fonts, one pygame.font.Font per (path, size)
+_fonts = {}
+
+def get_font(size, path = UI_FONT):
+	key = (path, size)
+	font = _fonts.get(key)
+	if font is None:
+		font = pygame.font.Font(resource_path(path), size)
+		_fonts[key] = font
+	return font
+
+# rendered text surfaces, least recently used entries are evicted first
+_text_cache = OrderedDict()
+
+def render_text(text, size, color, antialias = True, path = UI_FONT):
+	"""Render text with the shared font, reusing the surface while the text is unchanged"""
+	key = (path, size, text, color, antialias)
+	surf = _text_cache.get(key)
+	if surf is not None:
+		_text_cache.move_to_end(key)
+		return surf
+
+	surf = get_font(size, path).render(text, antialias, color)
+	_text_cache[key] = surf
+	if len(_text_cache) > TEXT_CACHE_SIZE:
+		_text_cache.popitem(last = False)
+	return surf
+
+# white flash silhouettes, keyed by the source surface itself and dropped with it
+_silhouettes = WeakKeyDictionary()
+
+def silhouette(surf):
+	"""White copy of surf's opaque pixels, built once per source image"""
+	white = _silhouettes.get(surf)
+	if white is None:
+		white = pygame.mask.from_surface(surf).to_surface()
+		white.set_colorkey((0,0,0))
+		_silhouettes[surf] = white
+	return white
@@ -1,23 +1,60 @@
 import pygame 
+from heapq import heappush, heappop
+
+class TimerManager:
+	"""
+	One heap of deadlines for the whole game, ticked once per frame.
+	Each tick only pops what has expired; cancelled entries are dropped lazily when they reach the top
+	"""
+	def __init__(self):
+		self.heap = []
+		self.count = 0 # tie-breaker so equal deadlines fire in scheduling order
+
+	def schedule(self, delay, func):
+		"""Call func once after delay ms; returns a handle for cancel()"""
+		self.count += 1
+		entry = [pygame.time.get_ticks() + delay, self.count, func]
+		heappush(self.heap, entry)
+		return entry
+
+	def cancel(self, entry):
+		entry[2] = None
+
+	def update(self):
+		now = pygame.time.get_ticks()
+		heap = self.heap
+		while heap and heap[0][0] <= now:
+			func = heappop(heap)[2]
+			if func:
+				func()
+
+	def clear(self):
+		self.heap.clear()
+
+timers = TimerManager()
 
 class Timer:
-	def __init__(self,duration,func = None):
+	def __init__(self,duration,func = None,manager = timers):
 		self.duration = duration
 		self.func = func
-		self.start_time = 0
+		self.manager = manager
+		self.entry = None
 		self.active = False
 
 	def activate(self):
+		if self.entry:
+			self.manager.cancel(self.entry)
 		self.active = True
-		self.start_time = pygame.time.get_ticks()
+		self.entry = self.manager.schedule(self.duration, self.expire)
 
 	def deactivate(self):
+		if self.entry:
+			self.manager.cancel(self.entry)
+		self.entry = None
 		self.active = False
-		self.start_time = 0
 
-	def update(self):
-		current_time = pygame.time.get_ticks()
-		if current_time - self.start_time >= self.duration:
-			if self.func and self.start_time != 0:
-				self.func()
-			self.deactivate()
+	def expire(self):
+		self.entry = None
+		self.active = False
+		if self.func:
+			self.func()
@@ -1,16 +1,11 @@
-import pygame
-from settings import *
-
 class Transition:
 	def __init__(self, reset, player):
 		
 		# setup
-		self.display_surface = pygame.display.get_surface()
 		self.reset = reset
 		self.player = player
 
-		# overlay image
-		self.image = pygame.Surface((SCREEN_WIDTH,SCREEN_HEIGHT))
+		# fade factor, applied to the screen by Sky.display together with the sky tint
 		self.color = 255
 		self.speed = -2
 
@@ -25,5 +20,3 @@ class Transition:
 			self.player.sleep = False
 			self.speed = -2
 
-		self.image.fill((self.color,self.color,self.color))
-		self.display_surface.blit(self.image, (0,0), special_flags = pygame.BLEND_RGBA_MULT)
@@ -0,0 +1,76 @@
+# world_query.py
+
+import pygame
+from settings import TILE_SIZE
+
+
+class WorldQuery:
+    """
+    世界对象的空间索引（均匀网格），按种类（'tree'、'interaction'、'ripe plant' 等）
+    提供点查询、矩形查询和最近对象查询；判定时使用对象当前的 rect
+    """
+
+    def __init__(self, cell_size=TILE_SIZE * 2):
+        self.cell_size = cell_size
+        self.buckets = {}  # kind -> {(cx, cy): [obj, ...]}
+        self.entries = {}  # obj -> (kind, cells)
+
+    def cells(self, rect):
+        size = self.cell_size
+        return [(cx, cy)
+                for cy in range(rect.top // size, (rect.bottom - 1) // size + 1)
+                for cx in range(rect.left // size, (rect.right - 1) // size + 1)]
+
+    def insert(self, obj, kind, rect=None):
+        if obj in self.entries:
+            self.remove(obj)
+        cells = self.cells(rect or obj.rect)
+        grid = self.buckets.setdefault(kind, {})
+        for cell in cells:
+            grid.setdefault(cell, []).append(obj)
+        self.entries[obj] = (kind, cells)
+
+    def remove(self, obj):
+        entry = self.entries.pop(obj, None)
+        if entry is None:
+            return
+        kind, cells = entry
+        grid = self.buckets[kind]
+        for cell in cells:
+            bucket = grid[cell]
+            bucket.remove(obj)
+            if not bucket:
+                del grid[cell]
+
+    def clear(self, kind):
+        for obj in [obj for obj, (k, _) in self.entries.items() if k == kind]:
+            self.remove(obj)
+
+    def candidates(self, rect, kind):
+        grid = self.buckets.get(kind)
+        if not grid:
+            return []
+        found = []
+        for cell in self.cells(rect):
+            for obj in grid.get(cell, ()):
+                if obj not in found:
+                    found.append(obj)
+        return found
+
+    def query_point(self, pos, kind):
+        """rect 包含 pos 的所有 kind 对象"""
+        x, y = int(pos[0]), int(pos[1])
+        return [obj for obj in self.candidates(pygame.Rect(x, y, 1, 1), kind)
+                if obj.rect.collidepoint(x, y)]
+
+    def query_rect(self, rect, kind):
+        """rect 与给定矩形相交的所有 kind 对象"""
+        return [obj for obj in self.candidates(rect, kind) if obj.rect.colliderect(rect)]
+
+    def nearest(self, pos, kind, area):
+        """area 范围内与 pos 距离最近的 kind 对象，没有则返回 None"""
+        found = self.query_rect(area, kind)
+        if not found:
+            return None
+        pos = pygame.math.Vector2(pos)
+        return min(found, key=lambda obj: pos.distance_squared_to(obj.rect.center))